@@ -1,381 +1,310 @@
 import streamlit as st
-import google.generativeai as genai
 import os
-from PyPDF2 import PdfReader
-import tempfile
-import markdown
-import re
-from io import BytesIO
 import time
+import threading
 
-# ReportLab imports for PDF generation
-from reportlab.lib.pagesizes import letter
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, ListItem, ListFlowable
-from reportlab.lib.enums import TA_LEFT, TA_CENTER
+from caching import content_hash, get_response_cache
+import llm
+from jobs import DONE, QUEUED, get_job_queue
+import metrics
+from export import discard_export, export_zip
+from session_store import get_session_store
+from sections import SECTIONED_RESUME
+from tailoring import (
+    analyze_resume,
+    analyze_rfp,
+    build_resume_pipeline,
+    clean_markdown,
+    clean_text_for_download,
+    estimate_resume_layout,
+    extract_text_cached,
+    generate_concise_resume,
+    markdown_to_pdf_reportlab,
+)
+import backends
+import pdf_text
 
-# Configure Gemini API
+# Configure Gemini API; the client itself is configured from this by backends on its first use
 os.environ["GOOGLE_API_KEY"] = ""
-genai.configure(api_key=os.environ["GOOGLE_API_KEY"])
 
-def extract_text_from_pdf(pdf_file):
-    """Extract text content from uploaded PDF file."""
-    try:
-        pdf_reader = PdfReader(pdf_file)
-        text = ""
-        for page in pdf_reader.pages:
-            text += page.extract_text()
-        return text
-    except Exception as e:
-        st.error(f"Error reading PDF: {e}")
-        return None
+# Import the PDF and Gemini libraries in a background thread once the first page has been drawn
+WARM_UP = os.environ.get("WARM_UP", "1") != "0"
 
-def analyze_resume(text):
-    """Use Gemini to analyze and extract key information from resume text."""
-    try:
-        model = genai.GenerativeModel("gemini-2.0-flash")
-        prompt = f"""
-        Analyze this resume text and extract the following key information:
-        - Personal Information (name, contact details)
-        - Professional Summary
-        - Key Skills
-        - Work Experience (most relevant and recent)
-        - Education
-        - Certifications (if any)
-        
-        Text: {text}
-        
-        Format the output in markdown with clear section headers and proper markdown formatting.
-        Focus on the most relevant information for a consultant role.
-        Use proper markdown syntax for headers (#), lists (-), and emphasis (*).
-        """
-        response = model.generate_content(prompt)
-        return response.text
-    except Exception as e:
-        st.error(f"Error analyzing resume: {e}")
-        return None
+# Default for the sidebar switch that streams Gemini output into the page as it arrives
+STREAM_OUTPUT = os.environ.get("STREAM_OUTPUT", "1") != "0"
+
+# Switch back to the original flow where a separate analysis call gates condensation
+SEQUENTIAL_RESUME_PROCESSING = os.environ.get("SEQUENTIAL_RESUME_PROCESSING", "0") == "1"
+
+# Seconds between checks of a running background job
+JOB_POLL_INTERVAL = float(os.environ.get("JOB_POLL_INTERVAL", "1.0"))
+
+# Default for the sidebar switch that shows the timing breakdown of the last run
+METRICS_PANEL = os.environ.get("METRICS_PANEL", "0") == "1"
+
+def extraction_progress(label):
+    """Return a progress callback that draws a Streamlit progress bar while pages are extracted."""
+    placeholder = st.empty()
+    
+    def update(done, total):
+        if done >= total:
+            placeholder.empty()
+        else:
+            placeholder.progress(done / total, text=f"{label}: page {done} of {total}")
+    
+    return update
 
-def analyze_rfp(text):
-    """Use Gemini to analyze and extract key requirements from RFP text."""
+def read_pdf(pdf_bytes, digest, label):
+    """Extract an uploaded PDF with a progress bar; returns None after showing the error if it cannot be read."""
     try:
-        model = genai.GenerativeModel("gemini-2.0-flash")
-        prompt = f"""
-        Analyze this Request for Proposal (RFP) document and extract the most important information required from a consultant profile standpoint.
-        
-        Focus on extracting:
-        - Required qualifications
-        - Technical skills needed
-        - Domain knowledge requirements
-        - Years of experience requirements
-        - Certifications required
-        - Specific expertise areas
-        - Project roles and responsibilities
-        - Any other critical requirements for consultants
-        
-        Text: {text}
-        
-        Format the output in markdown with clear section headers and proper markdown formatting.
-        Use proper markdown syntax for headers (#), lists (-), and emphasis (*).
-        Prioritize the most important requirements that would be relevant for matching a consultant profile.
-        """
-        response = model.generate_content(prompt)
-        return response.text
+        return extract_text_cached(pdf_bytes, digest, progress=extraction_progress(label))
     except Exception as e:
-        st.error(f"Error analyzing RFP: {e}")
+        st.error(str(e))
         return None
 
-def generate_concise_resume(raw_cv, rfp_requirements=None):
-    """Generate a concise 2-page resume using the analyzed information, optionally tailored to RFP requirements."""
-    try:
-        model = genai.GenerativeModel("gemini-2.0-flash")
-        
-        # Base prompt
-        base_prompt = f"""
-            You are an expert resume formatter and summarizer, specializing in refining consultant resumes for client evaluation. 
-            Your task is to transform the following consultant resume into a concise, high-impact, 2-page version tailored for client review.
-
-            Instructions for Refinement:
+def process_resume_job(job, resume_text, resume_hash, rfp_requirements=None, stream=False):
+    """Background job: condense and clean one resume, optionally tailored to RFP requirements."""
+    on_chunk = job.set_partial if stream else None
+    if SEQUENTIAL_RESUME_PROCESSING:
+        analyzed_info = analyze_resume(resume_text, on_chunk=on_chunk)
+        if not analyzed_info:
+            raise RuntimeError("Resume analysis produced no output")
+        concise_resume = generate_concise_resume(resume_text, rfp_requirements=rfp_requirements, on_chunk=on_chunk)
+        if not concise_resume:
+            raise RuntimeError("Concise resume generation produced no output")
+        return {
+            "resume_hash": resume_hash,
+            "analyzed_info": analyzed_info,
+            "concise_resume": concise_resume,
+            "cleaned_markdown": clean_markdown(concise_resume),
+            "stage_timings": {},
+        }
+    
+    # Only the stages feeding the cleaned markdown run; the unused analysis is skipped
+    run = build_resume_pipeline(rfp_requirements=rfp_requirements, on_chunk=on_chunk).run(
+        ["clean"], inputs={"extract": resume_text}
+    )
+    if not run.ok("clean"):
+        failed = next(stage for stage in ("condense", "clean") if not run.ok(stage))
+        raise RuntimeError(f"The {failed} stage produced no output")
+    return {
+        "resume_hash": resume_hash,
+        "analyzed_info": None,
+        "concise_resume": run.results["condense"],
+        "cleaned_markdown": run.results["clean"],
+        "stage_timings": run.timings,
+    }
 
-            Maximize Impact:
-            -Prioritize achievements, quantifiable results, and value delivered over general responsibilities.
-            -Highlight client outcomes, project impact, and business value created by the consultant.
+def process_rfp_job(job, rfp_text, rfp_hash, stream=False):
+    """Background job: extract the consultant requirements from an RFP."""
+    rfp_requirements = analyze_rfp(rfp_text, on_chunk=job.set_partial if stream else None)
+    if not rfp_requirements:
+        raise RuntimeError("RFP analysis produced no output")
+    return {"rfp_hash": rfp_hash, "rfp_requirements": rfp_requirements}
 
-            Format Professional Experience:
-            -Use ### for company names as section headers
-            -Use bullet points (-) for experience details under each company
-            -Include dates on the same line as company name in parentheses
-            -Example format:
-              ### Job Title | Company Name | Start Date - End Date |
-              - Achievement 1
-              - Achievement 2
+def remember(name, value):
+    """Keep a large result in the shared session store; the session only holds its handle."""
+    st.session_state[name] = get_session_store().put(value)
 
-            Summarize & Condense:
-            -Convert lengthy descriptions into concise, results-driven bullet points.
-            -Remove redundant, outdated, or lower-impact details.
+def recall(name):
+    """Return a result kept with remember, reading it back from the store if it was evicted from memory."""
+    return get_session_store().get(st.session_state[name])
 
-            Highlight Core Competencies:
-            -Clearly showcase technical skills, industry expertise, methodologies, and soft skills essential for consulting.
-            -Group skills into logical categories for easy scanning.
-            
-            Output Format:
-            -Use consistent markdown formatting throughout
-            -Ensure company names stand out as distinct sections
-            -Maintain proper hierarchy in the document structure
-        """
-        
-        # Add RFP-specific instructions if available
-        if rfp_requirements:
-            rfp_tailoring = f"""
-            RFP Tailoring:
-            -The resume should be specifically tailored to match the following RFP requirements:
-            
-            {rfp_requirements}
-            
-            -Emphasize experiences, skills, and achievements that directly align with these RFP requirements
-            -Reorganize content to highlight the most relevant qualifications first
-            -Use terminology and keywords from the RFP where appropriate
-            -Ensure that the consultant's qualifications that match the RFP requirements are clearly visible
-            """
-            base_prompt += rfp_tailoring
-        
-        # Complete the prompt with the resume content
-        complete_prompt = base_prompt + f"""
-            Here is the full consultant Resume:
+def recall_upload(name, pdf_bytes, digest, label):
+    """Return an upload's text kept with remember, extracting it again if its blob was pruned from disk."""
+    text = recall(name)
+    if text is None:
+        text = read_pdf(pdf_bytes, digest, label)
+        remember(name, text)
+    return text
 
-            {raw_cv}
- 
-            Begin the formatted, condensed 2-page resume below:
-        """
-        
-        response = model.generate_content(complete_prompt)
-        return response.text
-    except Exception as e:
-        st.error(f"Error generating concise resume: {e}")
-        return None
+def apply_resume_result(result):
+    """Store a finished resume job's output in the session, unless another resume was uploaded meanwhile."""
+    if result["resume_hash"] != st.session_state.resume_hash:
+        return
+    remember("analyzed_info", result["analyzed_info"])
+    remember("concise_resume", result["concise_resume"])
+    remember("cleaned_markdown", result["cleaned_markdown"])
+    # Listed for the bulk export; tailoring the same resume again replaces its entry
+    st.session_state.tailored_resumes[result["resume_hash"]] = {
+        "name": st.session_state.resume_name,
+        "markdown": st.session_state.cleaned_markdown,
+    }
+    st.session_state.stage_timings = result["stage_timings"]
+    st.session_state.resume_analyzed = True
+    st.success("Resume processing completed!")
+    if result["stage_timings"]:
+        st.caption("Stage timings: " + ", ".join(
+            f"{name} {seconds:.2f}s" for name, seconds in result["stage_timings"].items()
+        ))
 
-def clean_markdown(markdown_text):
-    """Clean and standardize markdown formatting."""
-    # Ensure consistent header formatting
-    markdown_text = re.sub(r'^#(?!#)\s*', '# ', markdown_text, flags=re.MULTILINE)
-    markdown_text = re.sub(r'^##(?!#)\s*', '## ', markdown_text, flags=re.MULTILINE)
-    markdown_text = re.sub(r'^###(?!#)\s*', '### ', markdown_text, flags=re.MULTILINE)
+def apply_rfp_result(result):
+    """Store a finished RFP job's requirements in the session, unless another RFP was uploaded meanwhile."""
+    if result["rfp_hash"] != st.session_state.rfp_hash:
+        return
+    remember("rfp_requirements", result["rfp_requirements"])
+    st.session_state.rfp_processed = True
+    st.success("RFP analysis completed!")
     
-    # Ensure consistent list formatting
-    markdown_text = re.sub(r'^\s*[-*]\s*', '- ', markdown_text, flags=re.MULTILINE)
-    
-    # Add proper spacing between sections
-    markdown_text = re.sub(r'\n{3,}', '\n\n', markdown_text)
-    
-    # Remove ```markdown at the start if present
-    markdown_text = re.sub(r'^```markdown\s*', '', markdown_text)
-    
-    return markdown_text
+    # If resume was already analyzed, suggest reprocessing it with the new RFP
+    if st.session_state.resume_analyzed:
+        st.info("You may want to reprocess the resume to tailor it to the new RFP requirements."
+                + (" Only the sections affected by the new requirements are regenerated." if SECTIONED_RESUME else ""))
 
-def clean_text_for_download(markdown_text):
+def show_job(state_key, title, run_label, apply_result):
     """
-    Removes markdown formatting characters (* and #) from text for plain text download
-    """
-    if not markdown_text:
-        return ""
-    
-    # Remove markdown headings (# symbols)
-    text = re.sub(r'^#+\s+', '', markdown_text, flags=re.MULTILINE)
+    Show the state of the job whose ID is in st.session_state[state_key]; returns True while it is unfinished.
     
-    # Remove bold and italic formatting (* symbols)
-    text = re.sub(r'\*\*', '', text)  # Remove bold (**)
-    text = re.sub(r'\*', '', text)    # Remove italic (*)
+    When the job has finished, apply_result(job.result) moves its output into
+    the session and the job ID is cleared.
+    """
+    job = get_job_queue().get(st.session_state[state_key])
+    if job is None:
+        st.session_state[state_key] = None
+        return False
     
-    # Remove other common markdown elements
-    text = re.sub(r'`', '', text)     # Remove code ticks
-    text = re.sub(r'\[([^\]]+)\]\([^\)]+\)', r'\1', text)  # Replace links with just the text
+    if not job.done:
+        st.subheader(title)
+        if job.status == QUEUED:
+            st.progress(0, text=f"Queued behind {get_job_queue().position(job)} other jobs")
+        else:
+            st.progress(50, text=f"Running for {job.elapsed():.0f}s")
+            if job.partial:
+                st.markdown(job.partial)
+        return True
     
-    return text
+    st.session_state[state_key] = None
+    st.session_state.last_run_spans = job.spans
+    st.session_state.last_run_label = run_label
+    if job.status == DONE:
+        apply_result(job.result)
+    else:
+        st.error(f"{run_label} failed: {job.error}")
+    return False
 
-def markdown_to_pdf_reportlab(markdown_text):
-    """Convert markdown to PDF using ReportLab with enhanced styling for a professional resume."""
-    buffer = BytesIO()
-    
-    # Use letter size with margins optimized for a resume
-    doc = SimpleDocTemplate(
-        buffer, 
-        pagesize=letter,
-        rightMargin=54,  # Slightly reduced margins
-        leftMargin=54,
-        topMargin=54,
-        bottomMargin=54
-    )
-    
-    # Define styles
-    styles = getSampleStyleSheet()
-    
-    # Create a professional color scheme
-    primary_color = colors.HexColor('#1a5276')  # Professional dark blue
-    secondary_color = colors.HexColor('#2874a6')  # Medium blue
-    accent_color = colors.HexColor('#3498db')  # Light blue
-    text_color = colors.HexColor('#2c3e50')  # Dark gray-blue for text
-    
-    # Create custom styles with different names to avoid conflicts
-    title_style = ParagraphStyle(
-        name='ResumeTitle', 
-        parent=styles['Heading1'],
-        fontName='Helvetica-Bold',
-        fontSize=20, 
-        spaceAfter=10,
-        textColor=primary_color,
-        alignment=TA_CENTER,
-        borderPadding=5,
-        borderWidth=0,
-        leading=24  # Line height
-    )
-    
-    section_style = ParagraphStyle(
-        name='ResumeSection', 
-        parent=styles['Heading2'],
-        fontName='Helvetica-Bold',
-        fontSize=14, 
-        spaceAfter=8,
-        spaceBefore=12,
-        textColor=primary_color,
-        borderColor=primary_color,
-        borderWidth=0,
-        borderPadding=5,
-        borderRadius=0,
-        leading=16,
-        # Add a bottom border
-        endDots=None,
-        bulletIndent=0,
-        firstLineIndent=0,
-        leftIndent=0,
-        rightIndent=0
-    )
-    
-    subsection_style = ParagraphStyle(
-        name='ResumeSubsection', 
-        parent=styles['Heading3'],
-        fontName='Helvetica-Bold',
-        fontSize=12, 
-        spaceAfter=4,
-        spaceBefore=6,
-        textColor=secondary_color,
-        leading=14,
-        leftIndent=0
-    )
-    
-    normal_style = ParagraphStyle(
-        name='ResumeNormal',
-        parent=styles['Normal'],
-        fontName='Helvetica',
-        fontSize=10,
-        spaceAfter=6,
-        textColor=text_color,
-        leading=14
-    )
-    
-    list_item_style = ParagraphStyle(
-        name='ResumeListItem',
-        parent=styles['Normal'],
-        fontName='Helvetica',
-        fontSize=10,
-        leftIndent=10,
-        firstLineIndent=-10,  # Hanging indent for bullet points
-        textColor=text_color,
-        leading=14,
-        spaceBefore=2,
-        spaceAfter=2
+def show_bulk_export(tailored_resumes):
+    """Let the user pick tailored resumes and download their PDFs and plain text as one ZIP."""
+    st.write("### Bulk Export")
+    # Uploads can share a file name, so repeated names are numbered to keep every resume selectable
+    labels = {}
+    for tailored in tailored_resumes.values():
+        label = tailored["name"]
+        while label in labels:
+            label = f"{tailored['name']} ({len(labels) + 1})"
+        labels[label] = tailored
+    built = False
+    with st.form(key="export_form"):
+        selected = st.multiselect("Resumes to include:", options=list(labels), default=list(labels))
+        if st.form_submit_button("Build ZIP"):
+            store = get_session_store()
+            entries = [(labels[label]["name"], store.get(labels[label]["markdown"])) for label in selected]
+            entries = [(name, markdown_text) for name, markdown_text in entries if markdown_text]
+            if not entries:
+                st.error("No resumes selected for the export.")
+                return None
+            try:
+                with st.spinner(f"Rendering {len(entries)} resumes..."):
+                    path = export_zip(entries)
+            except Exception as e:
+                st.error(f"Error building the ZIP: {str(e)}")
+                return None
+            # Only the path is kept in the session; the previous bundle is no longer reachable
+            if st.session_state.export_zip is not None:
+                discard_export(st.session_state.export_zip)
+            st.session_state.export_zip = path
+            built = True
+
+    if st.session_state.export_zip is None:
+        return None
+    # st.download_button copies its data into Streamlit's in-memory media store on every run it is drawn,
+    # so the ZIP is only handed over on the run it was built or asked for, not on every rerun
+    if not (built or st.button("Download ZIP")):
+        return None
+    try:
+        bundle = open(st.session_state.export_zip, "rb")
+    except OSError:
+        st.info("The ZIP has expired. Build it again to download it.")
+        st.session_state.export_zip = None
+        return None
+    with bundle:
+        st.download_button(
+            label="Save ZIP",
+            data=bundle,
+            file_name="tailored_resumes.zip",
+            mime="application/zip"
+        )
+
+def warm_up():
+    """Import PyPDF2 and ReportLab, build the PDF styles and create the Gemini client ahead of first use."""
+    with metrics.span("warm_up"):
+        pdf_text.load_reader()
+        from pdf_render import get_renderer
+        get_renderer()
+        backends.get_backend().warm_up(llm.MODEL_NAME)
+
+_warm_up_thread = None
+_warm_up_lock = threading.Lock()
+
+def start_warm_up():
+    """Run warm_up once per process in a background thread, so it never delays a page."""
+    global _warm_up_thread
+    with _warm_up_lock:
+        if _warm_up_thread is None and WARM_UP:
+            _warm_up_thread = threading.Thread(target=warm_up_quietly, name="warm-up", daemon=True)
+            _warm_up_thread.start()
+
+def warm_up_quietly():
+    try:
+        warm_up()
+    except Exception:
+        # Whatever failed here fails again, and is reported, when it is first really used
+        pass
+
+def show_layout_estimate(markdown_text):
+    """Show the predicted page count of the edited resume and the sections running past the page target."""
+    layout = estimate_resume_layout(markdown_text)
+    over = layout.pages - layout.page_limit
+    st.metric(
+        "Estimated pages",
+        layout.pages,
+        delta=f"{over} over target" if over > 0 else None,
+        delta_color="inverse"
     )
-    
-    # Parse markdown to ReportLab elements
-    elements = []
-    
-    # Split by lines to process headers and content
-    lines = markdown_text.split('\n')
-    i = 0
-    
-    # Add a function to clean text for PDF
-    def clean_text_for_pdf(text):
-        # Replace markdown bold/italic with actual formatting
-        text = re.sub(r'\*\*(.*?)\*\*', r'<b>\1</b>', text)
-        text = re.sub(r'\*(.*?)\*', r'<i>\1</i>', text)
-        # Replace backticks with appropriate formatting
-        text = re.sub(r'`(.*?)`', r'<font face="Courier">\1</font>', text)
-        return text
-    
-    # Process the first line as the resume title if it's a level 1 heading
-    if lines[0].strip().startswith('# '):
-        title_text = clean_text_for_pdf(lines[0].strip()[2:])
-        elements.append(Paragraph(title_text, title_style))
-        elements.append(Spacer(1, 10))
-        i = 1
-    
-    # Track if we're inside a section to handle spacing
-    in_section = False
-    
-    while i < len(lines):
-        line = lines[i].strip()
-        
-        # Process headers
-        if line.startswith('# '):
-            # Main title
-            title_text = clean_text_for_pdf(line[2:])
-            elements.append(Paragraph(title_text, title_style))
-            elements.append(Spacer(1, 10))
-            in_section = False
-            
-        elif line.startswith('## '):
-            # Section headers with horizontal rule effect
-            section_text = clean_text_for_pdf(line[3:])
-            elements.append(Spacer(1, 6))
-            elements.append(Paragraph(section_text, section_style))
-            # Add a thin horizontal line
-            elements.append(Spacer(1, 2))
-            elements.append(Paragraph('<hr width="100%" color="{0}" />'.format(primary_color.hexval()[1:]), 
-                                     ParagraphStyle(name='HRule', alignment=TA_LEFT)))
-            elements.append(Spacer(1, 6))
-            in_section = True
-            
-        elif line.startswith('### '):
-            # Subsection headers
-            subsection_text = clean_text_for_pdf(line[4:])
-            elements.append(Paragraph(subsection_text, subsection_style))
-            elements.append(Spacer(1, 4))
-            in_section = True
-        
-        # Process lists
-        elif line.startswith('- '):
-            # Collect all list items
-            list_items = []
-            while i < len(lines) and lines[i].strip().startswith('- '):
-                item_text = clean_text_for_pdf(lines[i].strip()[2:])
-                # Create a custom bullet point
-                bullet_para = Paragraph('• ' + item_text, list_item_style)
-                list_items.append(bullet_para)
-                i += 1
-            
-            # Add the list items directly (not using ListFlowable for better control)
-            for item in list_items:
-                elements.append(item)
-            
-            continue  # Skip the increment at the end since we've already advanced
-        
-        # Process normal paragraphs
-        elif line:
-            para_text = clean_text_for_pdf(line)
-            elements.append(Paragraph(para_text, normal_style))
-            
-        # Add a small space for empty lines to maintain structure
-        elif i > 0 and i < len(lines) - 1 and not lines[i-1].strip() and lines[i+1].strip():
-            if in_section:
-                elements.append(Spacer(1, 6))  # Smaller space within sections
-            else:
-                elements.append(Spacer(1, 10))  # Larger space between major sections
+    if layout.fits:
+        st.caption(f"Fits the {layout.page_limit}-page target; last page {layout.last_page_fill:.0%} full.")
+    else:
+        st.caption("Past the target: " + ", ".join(
+            f"{section['title']} (~{section['overflow_lines']} lines)" for section in layout.overflowing_sections
+        ))
+
+def show_run_metrics(run_label, spans):
+    """Show the spans of the last processing run in the sidebar, plus process-wide metric exports."""
+    with st.sidebar.expander("Last run breakdown", expanded=True):
+        if not spans:
+            st.caption("Process a resume or an RFP to see where the time goes.")
+        else:
+            st.caption(f"{run_label}: {len(spans)} spans")
+            rows = []
+            for span in spans:
+                details = ", ".join(
+                    f"{key} {value}" for key, value in span.items() if key not in ("name", "seconds")
+                )
+                rows.append(f"- **{span['name']}** {span['seconds']:.3f}s" + (f" ({details})" if details else ""))
+            st.markdown("\n".join(rows))
         
-        i += 1
-    
-    # Build the PDF
-    doc.build(elements)
-    buffer.seek(0)
-    return buffer.getvalue()
+        registry = metrics.get_registry()
+        st.download_button(
+            label="Export metrics (Prometheus)",
+            data=registry.to_prometheus(),
+            file_name="metrics.prom",
+            mime="text/plain"
+        )
+        st.download_button(
+            label="Export metrics (JSON lines)",
+            data=registry.to_json_lines(),
+            file_name="metrics.jsonl",
+            mime="application/json"
+        )
 
 def main():
     # Set page config to wide mode and add custom CSS for full screen
@@ -422,10 +351,36 @@ def main():
         st.session_state.cleaned_markdown = None
     if 'resume_text' not in st.session_state:
         st.session_state.resume_text = None
+    if 'resume_hash' not in st.session_state:
+        st.session_state.resume_hash = None
+    if 'rfp_text' not in st.session_state:
+        st.session_state.rfp_text = None
+    if 'rfp_hash' not in st.session_state:
+        st.session_state.rfp_hash = None
     if 'pdf_generated' not in st.session_state:
         st.session_state.pdf_generated = False
     if 'pdf_buffer' not in st.session_state:
         st.session_state.pdf_buffer = None
+    if 'last_run_spans' not in st.session_state:
+        st.session_state.last_run_spans = []
+        st.session_state.last_run_label = None
+    if 'resume_job_id' not in st.session_state:
+        st.session_state.resume_job_id = None
+    if 'rfp_job_id' not in st.session_state:
+        st.session_state.rfp_job_id = None
+    if 'resume_name' not in st.session_state:
+        st.session_state.resume_name = None
+    if 'tailored_resumes' not in st.session_state:
+        st.session_state.tailored_resumes = {}
+    if 'export_zip' not in st.session_state:
+        st.session_state.export_zip = None
+    
+    # Streaming renders model output as it arrives instead of after the full response
+    stream_output = st.sidebar.checkbox("Stream model output", value=STREAM_OUTPUT)
+    show_metrics = st.sidebar.checkbox("Show run metrics", value=METRICS_PANEL)
+    
+    # Set when a background job is still queued or running, so the page polls it again
+    jobs_active = False
     
     # Create two columns for the file uploaders
     col1, col2 = st.columns(2)
@@ -436,41 +391,33 @@ def main():
         
         # Only show process button if a resume is uploaded
         if uploaded_resume is not None:
-            # Extract text from PDF if not already done
-            if st.session_state.resume_text is None or uploaded_resume.name != st.session_state.resume_filename:
-                st.session_state.resume_text = extract_text_from_pdf(uploaded_resume)
-                st.session_state.resume_filename = uploaded_resume.name
+            # Extract text from PDF if this file content has not been seen yet
+            resume_bytes = uploaded_resume.getvalue()
+            resume_hash = content_hash(resume_bytes)
+            if st.session_state.resume_text is None or resume_hash != st.session_state.resume_hash:
+                remember("resume_text", read_pdf(resume_bytes, resume_hash, "Reading resume"))
+                st.session_state.resume_hash = resume_hash
+                st.session_state.resume_name = uploaded_resume.name
                 st.session_state.resume_analyzed = False  # Reset analysis flag for new file
                 st.session_state.analyzed_info = None
                 st.session_state.concise_resume = None
                 st.session_state.cleaned_markdown = None
             
-            # Process resume button
-            if st.button("Process Resume"):
-                with st.spinner("Processing resume..."):
-                    if st.session_state.resume_text:
-                        # Analyze resume content
-                        st.subheader("Resume Analysis Progress")
-                        progress_bar = st.progress(0)
-                        
-                        st.session_state.analyzed_info = analyze_resume(st.session_state.resume_text)
-                        progress_bar.progress(33)
-                        
-                        if st.session_state.analyzed_info:
-                            # Generate concise resume, using RFP requirements if available
-                            st.session_state.concise_resume = generate_concise_resume(
-                                st.session_state.resume_text, 
-                                rfp_requirements=st.session_state.rfp_requirements
-                            )
-                            progress_bar.progress(66)
-                            
-                            if st.session_state.concise_resume:
-                                # Clean markdown formatting
-                                st.session_state.cleaned_markdown = clean_markdown(st.session_state.concise_resume)
-                                progress_bar.progress(100)
-                                
-                                st.session_state.resume_analyzed = True
-                                st.success("Resume processing completed!")
+            # Processing runs as a background job, so reruns while it works do not lose it;
+            # clicks while a job is still running do not queue a duplicate
+            if st.button("Process Resume") and st.session_state.resume_text and not st.session_state.resume_job_id:
+                job = get_job_queue().submit(
+                    "resume",
+                    process_resume_job,
+                    recall_upload("resume_text", resume_bytes, resume_hash, "Reading resume"),
+                    st.session_state.resume_hash,
+                    recall("rfp_requirements"),
+                    stream_output
+                )
+                st.session_state.resume_job_id = job.id
+            
+            if st.session_state.resume_job_id:
+                jobs_active |= show_job("resume_job_id", "Resume Analysis Progress", "Process Resume", apply_resume_result)
     
     with col2:
         st.subheader("RFP Upload (Optional)")
@@ -478,45 +425,57 @@ def main():
         
         # Only show process button if an RFP is uploaded
         if uploaded_rfp is not None:
-            # Extract text from PDF if not already done
-            if not st.session_state.rfp_processed or uploaded_rfp.name != st.session_state.rfp_filename:
-                st.session_state.rfp_text = extract_text_from_pdf(uploaded_rfp)
-                st.session_state.rfp_filename = uploaded_rfp.name
+            # Extract text from PDF if this file content has not been seen yet
+            rfp_bytes = uploaded_rfp.getvalue()
+            rfp_hash = content_hash(rfp_bytes)
+            if st.session_state.rfp_text is None or rfp_hash != st.session_state.rfp_hash:
+                remember("rfp_text", read_pdf(rfp_bytes, rfp_hash, "Reading RFP"))
+                st.session_state.rfp_hash = rfp_hash
                 st.session_state.rfp_processed = False  # Reset processed flag for new file
             
             # Process RFP button
-            if st.button("Process RFP"):
-                with st.spinner("Processing RFP..."):
-                    if st.session_state.rfp_text:
-                        st.subheader("RFP Analysis")
-                        rfp_progress = st.progress(0)
-                        
-                        # Analyze RFP content
-                        st.session_state.rfp_requirements = analyze_rfp(st.session_state.rfp_text)
-                        rfp_progress.progress(100)
-                        
-                        if st.session_state.rfp_requirements:
-                            st.session_state.rfp_processed = True
-                            st.success("RFP analysis completed!")
-                            
-                            # If resume was already analyzed, suggest reprocessing it with the new RFP
-                            if st.session_state.resume_analyzed:
-                                st.info("You may want to reprocess the resume to tailor it to the new RFP requirements.")
+            if st.button("Process RFP") and st.session_state.rfp_text and not st.session_state.rfp_job_id:
+                job = get_job_queue().submit(
+                    "rfp",
+                    process_rfp_job,
+                    recall_upload("rfp_text", rfp_bytes, rfp_hash, "Reading RFP"),
+                    st.session_state.rfp_hash,
+                    stream_output
+                )
+                st.session_state.rfp_job_id = job.id
+            
+            if st.session_state.rfp_job_id:
+                jobs_active |= show_job("rfp_job_id", "RFP Analysis", "Process RFP", apply_rfp_result)
+    
+    # Results are read back from the session store once per run, from disk if they were evicted
+    rfp_requirements = recall("rfp_requirements") if st.session_state.rfp_processed else None
+    cleaned_markdown = recall("cleaned_markdown") if st.session_state.resume_analyzed else None
+    # A session left idle past SESSION_STORE_TTL can find its results pruned from disk
+    if st.session_state.rfp_processed and rfp_requirements is None:
+        st.session_state.rfp_processed = False
+        st.info("The RFP analysis has expired. Process the RFP again to see it.")
+    if st.session_state.resume_analyzed and cleaned_markdown is None:
+        st.session_state.resume_analyzed = False
+        st.info("The processed resume has expired. Process the resume again to see it.")
+    # Bundling only pays off once several resumes have been tailored in this session
+    bulk_export = len(st.session_state.tailored_resumes) > 1
     
     # Create tabs for all features
     # Only show Results section if something has been processed
-    if (st.session_state.rfp_processed and st.session_state.rfp_requirements) or \
-       (st.session_state.resume_analyzed and st.session_state.cleaned_markdown):
+    if (st.session_state.rfp_processed and rfp_requirements) or \
+       (st.session_state.resume_analyzed and cleaned_markdown) or bulk_export:
         st.subheader("Results")
         
         # Determine which tabs to show
         tabs_to_show = []
-        if st.session_state.rfp_processed and st.session_state.rfp_requirements:
+        if st.session_state.rfp_processed and rfp_requirements:
             tabs_to_show.append("RFP Requirements")
-        if st.session_state.resume_analyzed and st.session_state.cleaned_markdown:
+        if st.session_state.resume_analyzed and cleaned_markdown:
             # Hide the Markdown Resume tab as requested, but keep the PDF Generator
             # tabs_to_show.append("Markdown Resume")  # Commented out to hide this tab
             tabs_to_show.append("PDF Generator")
+        if bulk_export:
+            tabs_to_show.append("Bulk Export")
         
         # Only show tabs if there are results to display
         if tabs_to_show:
@@ -526,11 +485,11 @@ def main():
             tab_index = 0
             
             # RFP Requirements tab
-            if st.session_state.rfp_processed and st.session_state.rfp_requirements:
+            if st.session_state.rfp_processed and rfp_requirements:
                 with tabs[tab_index]:
-                    st.markdown(st.session_state.rfp_requirements)
+                    st.markdown(rfp_requirements)
                     # Clean markdown for download
-                    clean_rfp_text = clean_text_for_download(st.session_state.rfp_requirements)
+                    clean_rfp_text = clean_text_for_download(rfp_requirements)
                     st.download_button(
                         label="Download RFP Requirements",
                         data=clean_rfp_text,
@@ -540,44 +499,95 @@ def main():
                 tab_index += 1
             
             # Markdown Resume tab (hidden but functionality remains)
-            if st.session_state.resume_analyzed and st.session_state.cleaned_markdown:
+            if st.session_state.resume_analyzed and cleaned_markdown:
                 # The content is now outside of any tab, so we don't need to use tabs[tab_index]
                 # This content is now hidden from the UI
                 
                 # We also don't increment tab_index since this tab is hidden
                 # Keep the variables and processing for potential future use
                 resume_title = "Optimized Resume"
-                if st.session_state.rfp_processed and st.session_state.rfp_requirements:
+                if st.session_state.rfp_processed and rfp_requirements:
                     resume_title += " (Tailored to RFP)"
                 
                 # Store these values but don't display them
-                clean_resume_text = clean_text_for_download(st.session_state.cleaned_markdown)
+                clean_resume_text = clean_text_for_download(cleaned_markdown)
                 
-            # PDF Generator tab
-            with tabs[tab_index]:
-                st.write("### PDF Generation")
-                markdown_editor = st.text_area(
-                    "Edit Markdown (if needed):",
-                    value=st.session_state.cleaned_markdown,
-                    height=400
-                )
+            # PDF Generator tab (only present once a resume has been processed)
+            if st.session_state.resume_analyzed and cleaned_markdown:
+                with tabs[tab_index]:
+                    st.write("### PDF Generation")
+                    editor_column, layout_column = st.columns([4, 1])
+                    with editor_column:
+                        markdown_editor = st.text_area(
+                            "Edit Markdown (if needed):",
+                            value=cleaned_markdown,
+                            height=400
+                        )
+                    # Re-measured on every edit; only the changed paragraphs are wrapped again
+                    with layout_column:
+                        show_layout_estimate(markdown_editor)
                 
-                # Use a form to prevent rerunning the whole app
-                with st.form(key="pdf_form"):
-                    generate_button = st.form_submit_button("Generate PDF")
-                    if generate_button:
-                        st.session_state.pdf_buffer = markdown_to_pdf_reportlab(markdown_editor)
-                        st.session_state.pdf_generated = True
+                    # Use a form to prevent rerunning the whole app
+                    with st.form(key="pdf_form"):
+                        generate_button = st.form_submit_button("Generate PDF")
+                        if generate_button:
+                            remember("pdf_buffer", markdown_to_pdf_reportlab(markdown_editor))
+                            st.session_state.pdf_generated = True
+                            # The bulk export bundles the edited markdown, as downloaded here
+                            tailored = st.session_state.tailored_resumes.get(st.session_state.resume_hash)
+                            if tailored is not None:
+                                tailored["markdown"] = get_session_store().put(markdown_editor)
                 
-                # Only show download button after PDF is generated
-                if st.session_state.pdf_generated and st.session_state.pdf_buffer is not None:
-                    st.success("PDF successfully generated!")
-                    st.download_button(
-                        label="Download PDF",
-                        data=st.session_state.pdf_buffer,
-                        file_name="optimized_resume.pdf",
-                        mime="application/pdf"
-                    )
+                    # Only show download button after PDF is generated
+                    pdf_buffer = recall("pdf_buffer") if st.session_state.pdf_generated else None
+                    if pdf_buffer is not None:
+                        st.success("PDF successfully generated!")
+                        st.download_button(
+                            label="Download PDF",
+                            data=pdf_buffer,
+                            file_name="optimized_resume.pdf",
+                            mime="application/pdf"
+                        )
+                    elif st.session_state.pdf_generated:
+                        st.session_state.pdf_generated = False
+                        st.info("The generated PDF has expired. Generate it again to download it.")
+                tab_index += 1
+            
+            # Bulk Export tab
+            if bulk_export:
+                with tabs[tab_index]:
+                    show_bulk_export(st.session_state.tailored_resumes)
+    
+    # Show how often Gemini calls are served from the shared response cache
+    response_cache = get_response_cache()
+    if response_cache is not None:
+        cache_stats = response_cache.stats()
+        st.sidebar.caption(
+            f"Response cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses, "
+            f"{cache_stats['entries']} entries"
+        )
+    store_stats = get_session_store().stats()
+    st.sidebar.caption(
+        f"Session store: {store_stats['memory_entries']} results, "
+        f"{store_stats['memory_bytes'] / 1e6:.1f} MB in memory, {store_stats['disk_hits']} read back from disk"
+    )
+    llm_stats = llm.metrics()
+    st.sidebar.caption(
+        f"Gemini calls: {llm_stats['calls']}, retries: {llm_stats['retries']}, "
+        f"rate limit wait: {llm_stats['rate_limit_wait_seconds']:.1f}s"
+    )
+    if show_metrics:
+        show_run_metrics(st.session_state.last_run_label, st.session_state.last_run_spans)
+    job_stats = get_job_queue().stats()
+    st.sidebar.caption(f"Jobs: {job_stats['running']} running, {job_stats['queued']} queued")
+
+    # Everything above is on screen by now; load what the first upload and run will need
+    start_warm_up()
+
+    if jobs_active:
+        # Poll the job again; any widget interaction meanwhile simply starts the next run sooner
+        time.sleep(JOB_POLL_INTERVAL)
+        st.rerun()
 
 if __name__ == "__main__":
     main()
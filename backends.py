@@ -0,0 +1,322 @@
+import hashlib
+import os
+import random
+import re
+import threading
+import time
+from collections import Counter
+
+# Which backend generate_text uses: "gemini" for the real API, "stub" for the offline stand-in
+LLM_BACKEND = os.environ.get("LLM_BACKEND", "gemini")
+LLM_STUB_LATENCY = float(os.environ.get("LLM_STUB_LATENCY", "0.5"))
+LLM_STUB_TOKENS_PER_SECOND = float(os.environ.get("LLM_STUB_TOKENS_PER_SECOND", "250"))
+LLM_STUB_ERROR_RATE = float(os.environ.get("LLM_STUB_ERROR_RATE", "0"))
+
+_genai = None
+_genai_lock = threading.Lock()
+
+
+def load_genai():
+    """
+    Import google.generativeai and configure it with GOOGLE_API_KEY, once per process.
+
+    The import takes about a second, so it is left until the first Gemini
+    request (or the app's background warm-up) instead of every cold start.
+    """
+    global _genai
+    with _genai_lock:
+        if _genai is None:
+            import google.generativeai as genai
+            genai.configure(api_key=os.environ.get("GOOGLE_API_KEY"))
+            _genai = genai
+        return _genai
+
+
+class LLMBackend:
+    """
+    Interface between the prompt helpers and a text generation service.
+
+    generate returns the full response text; stream yields text chunks and
+    must stop the underlying request when the generator is closed early.
+    Exceptions listed in retryable_errors are retried by llm.generate_text.
+    """
+
+    name = "base"
+    retryable_errors = ()
+
+    def cache_name(self, model_name):
+        """Name under which this backend's responses are stored in the response cache."""
+        return f"{self.name}/{model_name}"
+
+    def generate(self, prompt, model_name):
+        raise NotImplementedError
+
+    def stream(self, prompt, model_name):
+        raise NotImplementedError
+
+    def warm_up(self, model_name):
+        """Prepare the client for a model ahead of the first request; nothing to do by default."""
+
+
+class GeminiBackend(LLMBackend):
+    """Google Gemini through google.generativeai, with one client reused per model."""
+
+    name = "gemini"
+
+    def __init__(self):
+        self._models = {}
+        self._lock = threading.Lock()
+
+    @property
+    def retryable_errors(self):
+        # Quota exhaustion and transient server-side failures; only looked up once a request has failed
+        from google.api_core import exceptions as google_exceptions
+        return (
+            google_exceptions.ResourceExhausted,
+            google_exceptions.TooManyRequests,
+            google_exceptions.ServiceUnavailable,
+            google_exceptions.InternalServerError,
+            google_exceptions.DeadlineExceeded,
+        )
+
+    def cache_name(self, model_name):
+        # Plain model names keep responses cached before backends existed valid
+        return model_name
+
+    def get_model(self, model_name):
+        """Return the shared client for a model, creating it on first use."""
+        with self._lock:
+            model = self._models.get(model_name)
+            if model is None:
+                model = self._models[model_name] = load_genai().GenerativeModel(model_name)
+            return model
+
+    def warm_up(self, model_name):
+        self.get_model(model_name)
+
+    def generate(self, prompt, model_name):
+        return self.get_model(model_name).generate_content(prompt).text
+
+    def stream(self, prompt, model_name):
+        response = self.get_model(model_name).generate_content(prompt, stream=True)
+        completed = False
+        try:
+            for chunk in response:
+                yield chunk.text
+            completed = True
+        finally:
+            if not completed:
+                # Cancel the gRPC stream behind a partially consumed response
+                cancel = getattr(getattr(response, "_iterator", None), "cancel", None)
+                if cancel is not None:
+                    cancel()
+
+
+class StubBackendError(Exception):
+    """Simulated transient failure raised by the stub backend."""
+
+
+STOPWORDS = set("""
+a about above after again all also an and any are as at be been before being below between both but by can
+could did do does doing during each few for from further had has have having he her here hers him his how i
+if in into is it its itself just me more most my no nor not now of off on once only or other our out over own
+same she should so some such than that the their them then there these they this those through to too under
+until up very was we were what when where which while who whom why will with would you your
+led managed senior junior lead built delivered developed designed worked experience consultant
+require required requires must shall
+""".split())
+
+
+# Section prompts of tailoring.generate_resume_by_section name the one section to write
+SECTION_REQUEST = re.compile(r"write only the .+? section\.")
+SECTION_HEADING = re.compile(r'Start the section with the heading "([^"]+)"')
+
+
+class StubBackend(LLMBackend):
+    """
+    Deterministic offline backend that answers with realistic markdown.
+
+    The response depends only on the prompt, so repeated runs produce the same
+    output. latency is the delay before the first token and tokens_per_second
+    paces the rest of the response (four characters per token), so the
+    non-LLM parts of the pipeline can be profiled against a model of known
+    speed. error_rate makes that fraction of calls fail with a retryable error.
+    """
+
+    name = "stub"
+    retryable_errors = (StubBackendError,)
+
+    def __init__(self, latency=LLM_STUB_LATENCY, tokens_per_second=LLM_STUB_TOKENS_PER_SECOND,
+                 error_rate=LLM_STUB_ERROR_RATE):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+
+    def _maybe_fail(self):
+        if self.error_rate and random.random() < self.error_rate:
+            raise StubBackendError("Simulated transient model failure")
+
+    def _generation_seconds(self, text):
+        if not self.tokens_per_second:
+            return 0.0
+        return (len(text) / 4) / self.tokens_per_second
+
+    def generate(self, prompt, model_name):
+        self._maybe_fail()
+        text = self.respond(prompt)
+        time.sleep(self.latency + self._generation_seconds(text))
+        return text
+
+    def stream(self, prompt, model_name):
+        self._maybe_fail()
+        text = self.respond(prompt)
+        time.sleep(self.latency)
+        # Emit roughly twenty tokens per chunk, like the Gemini streaming API
+        step = 80
+        for start in range(0, len(text), step):
+            chunk = text[start:start + step]
+            time.sleep(self._generation_seconds(chunk))
+            yield chunk
+
+    def respond(self, prompt):
+        """Return the deterministic markdown response for a prompt."""
+        rng = random.Random(hashlib.sha256(prompt.encode("utf-8")).hexdigest())
+        if "consultant Resume" in prompt:
+            if SECTION_REQUEST.search(prompt):
+                heading = SECTION_HEADING.search(prompt)
+                return self._resume_section(self._concise_resume(prompt, rng), heading and heading.group(1))
+            return self._concise_resume(prompt, rng)
+        if "Request for Proposal" in prompt:
+            return self._rfp_requirements(prompt, rng)
+        return self._resume_analysis(prompt, rng)
+
+    @staticmethod
+    def _payload(prompt, start_markers, end_marker):
+        """Return the document pasted into a prompt, between the first start marker found and end_marker."""
+        for marker in start_markers:
+            index = prompt.rfind(marker)
+            if index >= 0:
+                prompt = prompt[index + len(marker):]
+                break
+        end = prompt.find(end_marker)
+        return prompt[:end] if end >= 0 else prompt
+
+    @staticmethod
+    def _keywords(text, count):
+        # Capitalized terms are mostly technologies, methodologies and certifications
+        words = re.findall(r"\b[A-Z][A-Za-z0-9+#]*(?:[./-][A-Za-z0-9+#]+)*", text)
+        counts = Counter(word for word in words if len(word) > 1 and word.lower() not in STOPWORDS)
+        keywords = sorted(counts, key=lambda word: (-counts[word], word))[:count]
+        defaults = ["Python", "Cloud Architecture", "Agile Delivery", "Data Engineering", "Stakeholder Management",
+                    "SQL", "Azure", "Change Management", "DevOps", "Business Analysis"]
+        return keywords + [word for word in defaults if word not in keywords][:max(0, count - len(keywords))]
+
+    def _concise_resume(self, prompt, rng):
+        resume = self._payload(prompt, ["Here is the full consultant Resume:"], "Begin the formatted")
+        first_line = next((line.strip() for line in resume.splitlines() if line.strip()), "")
+        name = first_line if 0 < len(first_line) <= 40 else "Jordan Taylor"
+        skills = self._keywords(resume.replace(first_line, ""), 12)
+        roles = max(2, min(6, len(resume) // 1500))
+        lines = [
+            f"# {name}",
+            "",
+            "## Professional Summary",
+            f"Consultant with {rng.randint(6, 18)} years of experience delivering **{skills[0]}** and "
+            f"**{skills[1]}** programmes for enterprise clients, with a record of measurable business outcomes.",
+            "",
+            "## Core Competencies",
+            f"- **Technical:** {', '.join(skills[:4])}",
+            f"- **Delivery:** {', '.join(skills[4:8])}",
+            f"- **Domain:** {', '.join(skills[8:12])}",
+            "",
+            "## Professional Experience",
+        ]
+        year = 2024
+        for role in range(roles):
+            start = year - rng.randint(1, 4)
+            lines.append(f"### {rng.choice(['Senior Consultant', 'Lead Consultant', 'Solution Architect', 'Engagement Manager'])}"
+                         f" | {rng.choice(['Acme Corp', 'Globex', 'Initech', 'Umbrella Group', 'Stark Industries'])}"
+                         f" | {start} - {year} |")
+            for _ in range(3):
+                lines.append(f"- Led {rng.choice(skills)} work that cut delivery time by {rng.randint(10, 45)}% "
+                             f"and saved *${rng.randint(1, 9)}M* annually")
+            lines.append("")
+            year = start
+        lines += [
+            "## Education",
+            f"- **MSc {rng.choice(['Computer Science', 'Information Systems', 'Engineering'])}**, State University",
+            "",
+            "## Certifications",
+            f"- {rng.choice(['AWS Solutions Architect', 'PMP', 'Azure Administrator', 'TOGAF'])}",
+        ]
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _resume_section(resume, heading):
+        """Cut the section under heading out of a whole concise resume; no heading means the title block."""
+        blocks = re.split(r"\n(?=## )", resume.strip())
+        if heading is None:
+            return blocks[0] + "\n"
+        for block in blocks:
+            if block.split("\n", 1)[0] == heading:
+                return block + "\n"
+        return "NO CONTENT FOR THIS SECTION\n"
+
+    def _rfp_requirements(self, prompt, rng):
+        rfp = self._payload(prompt, ["Text:", "Partial analyses:"], "Format the output")
+        skills = self._keywords(rfp, 10)
+        return "\n".join([
+            "# RFP Requirements Analysis",
+            "",
+            "## Required Qualifications",
+            "- Bachelor's degree or higher in a relevant field",
+            f"- Proven delivery of **{skills[0]}** initiatives",
+            "",
+            "## Technical Skills Needed",
+            *[f"- {skill}" for skill in skills[:6]],
+            "",
+            "## Years of Experience Requirements",
+            f"- Minimum *{rng.randint(5, 12)} years* of consulting experience",
+            "",
+            "## Certifications Required",
+            f"- {rng.choice(['PMP', 'AWS Certified', 'ITIL', 'CISSP'])} or equivalent",
+            "",
+            "## Project Roles and Responsibilities",
+            *[f"- Own {skill} workstream deliverables" for skill in skills[6:10]],
+        ]) + "\n"
+
+    def _resume_analysis(self, prompt, rng):
+        resume = self._payload(prompt, ["Text:"], "Format the output")
+        skills = self._keywords(resume, 8)
+        return "\n".join([
+            "# Resume Analysis",
+            "",
+            "## Personal Information",
+            "- **Name:** Jordan Taylor",
+            "",
+            "## Key Skills",
+            *[f"- {skill}" for skill in skills],
+            "",
+            "## Work Experience",
+            f"- {rng.randint(6, 18)} years across consulting engagements",
+        ]) + "\n"
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """Return the process-wide backend selected by LLM_BACKEND."""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = StubBackend() if LLM_BACKEND == "stub" else GeminiBackend()
+        return _backend
+
+
+def set_backend(backend):
+    """Replace the process-wide backend, e.g. with a StubBackend in tests and load tests."""
+    global _backend
+    with _backend_lock:
+        _backend = backend
@@ -0,0 +1,301 @@
+"""
+Headless batch mode: tailor a whole directory of resume PDFs to one RFP.
+
+    python batch.py resumes/ rfp.pdf --out tailored/
+
+The RFP is analyzed once, resumes are extracted in a process pool and
+condensed with bounded concurrency. With --top N every resume is first
+ranked against the RFP requirements locally and only the N best matches
+are sent to the model. Each PDF is written as soon as it is
+ready, and manifest.json in the output directory records the status and
+timings of every file. Rerunning the same command skips resumes that were
+already tailored to the same RFP. With --zip PATH every tailored resume's
+PDF and plain text are also bundled into one ZIP.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+import compaction
+import llm
+import metrics
+from export import write_zip
+from caching import atomic_write, content_hash
+from matching import load_or_build, matched_terms, requirement_weights
+from tailoring import analyze_rfp, build_resume_pipeline, extract_text_cached
+
+MANIFEST_NAME = "manifest.json"
+INDEX_NAME = "resume_index.npz"
+
+
+def _write_atomic(path, data):
+    """Write bytes to path via a temporary file so a crash never leaves a truncated output."""
+    with atomic_write(path) as f:
+        f.write(data)
+
+
+def _extract_resume(path):
+    """Read and extract one resume in a worker process; returns (content hash, text, seconds spent)."""
+    started = time.perf_counter()
+    with open(path, "rb") as f:
+        data = f.read()
+    digest = content_hash(data)
+    # Already inside a pool worker, so extract this file's pages inline
+    text = extract_text_cached(data, digest, workers=1)
+    return digest, text, time.perf_counter() - started
+
+
+class Manifest:
+    """Per-file status and timing record for a batch, saved after every update so reruns can resume."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.data = {"rfp": None, "resumes": {}}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.data = json.load(f)
+
+    def is_done(self, name, resume_hash, rfp_hash, output_path):
+        entry = self.data["resumes"].get(name)
+        return (
+            entry is not None
+            and entry.get("status") == "ok"
+            and entry.get("resume_hash") == resume_hash
+            and entry.get("rfp_hash") == rfp_hash
+            and os.path.exists(output_path)
+        )
+
+    def update(self, name, **fields):
+        with self._lock:
+            self.data["resumes"].setdefault(name, {}).update(fields)
+            self.save()
+
+    def update_many(self, updates):
+        """Apply {name: fields} for many resumes with a single save."""
+        with self._lock:
+            for name, fields in updates.items():
+                self.data["resumes"].setdefault(name, {}).update(fields)
+            self.save()
+
+    def save(self):
+        _write_atomic(self.path, json.dumps(self.data, indent=2, sort_keys=True).encode("utf-8"))
+
+
+def run_batch(resume_dir, rfp_path, out_dir, concurrency=4, extract_workers=None, top=None):
+    """
+    Tailor every PDF in resume_dir to the RFP and return the manifest data.
+
+    With top set, resumes are first ranked against the RFP requirements with
+    the local matcher and only the top best matches are tailored; the rest
+    are recorded as "filtered" with their rank and score.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = Manifest(os.path.join(out_dir, MANIFEST_NAME))
+
+    # Analyze the RFP once for the whole batch
+    started = time.perf_counter()
+    with open(rfp_path, "rb") as f:
+        rfp_bytes = f.read()
+    rfp_hash = content_hash(rfp_bytes)
+    try:
+        rfp_text = extract_text_cached(rfp_bytes, rfp_hash)
+    except Exception as e:
+        raise SystemExit(f"Could not extract text from {rfp_path}: {e}") from e
+    if not rfp_text:
+        raise SystemExit(f"Could not extract text from {rfp_path}")
+    try:
+        rfp_requirements = analyze_rfp(rfp_text)
+    except Exception as e:
+        raise SystemExit(f"Could not analyze {rfp_path}: {e}") from e
+    if not rfp_requirements:
+        raise SystemExit(f"Could not analyze {rfp_path}")
+    manifest.data["rfp"] = {
+        "file": os.path.basename(rfp_path),
+        "hash": rfp_hash,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+    manifest.save()
+    _write_atomic(os.path.join(out_dir, "rfp_requirements.md"), rfp_requirements.encode("utf-8"))
+
+    resume_paths = sorted(
+        os.path.join(resume_dir, name)
+        for name in os.listdir(resume_dir)
+        if name.lower().endswith(".pdf")
+    )
+    print(f"RFP analyzed in {manifest.data['rfp']['seconds']}s; {len(resume_paths)} resumes to process")
+
+    def tailor(name, resume_hash, text, extract_seconds):
+        """Condense one resume against the RFP and write its PDF; never raises."""
+        started = time.perf_counter()
+        stem = os.path.splitext(name)[0]
+        try:
+            # A batch tailors each resume once, so per-section caching would only multiply the calls
+            run = build_resume_pipeline(rfp_requirements=rfp_requirements, sectioned=False).run(
+                ["render"], inputs={"extract": text}
+            )
+            if not run.ok("render"):
+                failed = next(stage for stage in ("condense", "clean", "render") if not run.ok(stage))
+                raise RuntimeError(f"{failed} stage produced no output")
+            _write_atomic(os.path.join(out_dir, stem + ".md"), run.results["clean"].encode("utf-8"))
+            _write_atomic(os.path.join(out_dir, stem + ".pdf"), run.results["render"])
+            status, error, stages = "ok", None, run.timings
+        except Exception as e:
+            status, error, stages = "failed", str(e), {}
+        seconds = time.perf_counter() - started
+        manifest.update(
+            name,
+            status=status,
+            error=error,
+            resume_hash=resume_hash,
+            rfp_hash=rfp_hash,
+            output=stem + ".pdf" if status == "ok" else None,
+            extract_seconds=round(extract_seconds, 3),
+            seconds=round(seconds, 3),
+            stages={stage: round(value, 3) for stage, value in stages.items()},
+        )
+        print(f"[{status}] {name} ({seconds:.1f}s){': ' + error if error else ''}")
+
+    def extracted(extract_pool):
+        """Yield (name, resume hash, text, extract seconds) for each readable resume as its extraction finishes."""
+        submitted = {extract_pool.submit(_extract_resume, path): (path, time.perf_counter()) for path in resume_paths}
+        for future in as_completed(submitted):
+            path, submitted_at = submitted[future]
+            name = os.path.basename(path)
+            extract_seconds = time.perf_counter() - submitted_at
+            try:
+                resume_hash, text, worker_seconds = future.result()
+                # Spans recorded in the worker process stay there, so report its timing here
+                metrics.observe("batch_extract_seconds", worker_seconds)
+            except Exception as e:
+                manifest.update(name, status="failed", error=f"extraction failed: {e}", rfp_hash=rfp_hash)
+                print(f"[failed] {name}: extraction failed: {e}")
+                continue
+            if not text:
+                manifest.update(name, status="failed", error="no text extracted", resume_hash=resume_hash, rfp_hash=rfp_hash)
+                print(f"[failed] {name}: no text extracted")
+                continue
+            yield name, resume_hash, text, extract_seconds
+
+    def shortlist(resumes):
+        """Rank all extracted resumes against the requirements locally and keep the top ones."""
+        started = time.perf_counter()
+        index = load_or_build(
+            os.path.join(out_dir, INDEX_NAME),
+            [(name, resume_hash, text) for name, resume_hash, text, _ in resumes],
+        )
+        weights = requirement_weights(rfp_requirements)
+        ranking = index.rank(weights)
+        texts = {name: text for name, _, text, _ in resumes}
+        selected = set()
+        updates = {}
+        for rank, (name, score) in enumerate(ranking, start=1):
+            fields = {"match_rank": rank, "match_score": round(score, 4)}
+            if rank <= top:
+                selected.add(name)
+                fields["matched_terms"] = matched_terms(weights, texts[name], limit=5)
+            else:
+                fields.update(status="filtered", error=None, output=None, rfp_hash=rfp_hash)
+            updates[name] = fields
+        manifest.update_many(updates)
+        print(
+            f"Ranked {len(ranking)} resumes in {time.perf_counter() - started:.2f}s; "
+            f"tailoring the top {min(top, len(ranking))}"
+        )
+        return [resume for resume in resumes if resume[0] in selected]
+
+    # Extract in a process pool and hand each resume to the tailoring threads as soon as it is read;
+    # with top set, every resume is extracted and ranked first so only the best matches reach the LLM
+    # spawn rather than fork: RFP extraction may already have started pdf_text's pool threads in this process
+    spawn = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=extract_workers, mp_context=spawn) as extract_pool, \
+            ThreadPoolExecutor(max_workers=concurrency) as tailor_pool:
+        resumes = extracted(extract_pool)
+        if top is not None:
+            resumes = shortlist(list(resumes))
+        tailoring = []
+        for name, resume_hash, text, extract_seconds in resumes:
+            output_path = os.path.join(out_dir, os.path.splitext(name)[0] + ".pdf")
+            if manifest.is_done(name, resume_hash, rfp_hash, output_path):
+                print(f"[skip] {name} already tailored to this RFP")
+                continue
+            tailoring.append(tailor_pool.submit(tailor, name, resume_hash, text, extract_seconds))
+
+        for future in tailoring:
+            future.result()
+
+    return manifest.data
+
+
+def bundle_outputs(out_dir, data, zip_path, workers=None):
+    """
+    Write every successfully tailored resume's PDF and plain text into one ZIP; returns the count.
+
+    The PDFs are rendered again from the .md files in out_dir, so edits made
+    to them after the batch are included.
+    """
+    entries = []
+    for name, entry in sorted(data["resumes"].items()):
+        if entry.get("status") != "ok":
+            continue
+        with open(os.path.join(out_dir, os.path.splitext(name)[0] + ".md"), encoding="utf-8") as f:
+            entries.append((name, f.read()))
+
+    # Streamed through a temporary file, so a failed export never leaves a truncated ZIP
+    with atomic_write(zip_path) as f:
+        return write_zip(entries, f, workers=workers)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tailor a directory of resume PDFs to one RFP.")
+    parser.add_argument("resume_dir", help="Directory containing resume PDFs")
+    parser.add_argument("rfp", help="RFP PDF to tailor the resumes to")
+    parser.add_argument("--out", default="tailored", help="Output directory for PDFs and manifest.json")
+    parser.add_argument("--concurrency", type=int, default=4, help="Resumes condensed at the same time")
+    parser.add_argument("--rpm", type=float, default=None, help="Gemini requests per minute (default: LLM_REQUESTS_PER_MINUTE, 0 = no limit)")
+    parser.add_argument("--tpm", type=float, default=None, help="Gemini prompt tokens per minute (default: LLM_TOKENS_PER_MINUTE, 0 = no limit)")
+    parser.add_argument("--extract-workers", type=int, default=None, help="Processes used for PDF extraction")
+    parser.add_argument("--top", type=int, default=None, help="Only tailor the N resumes that best match the RFP")
+    parser.add_argument("--compaction", type=int, default=None, choices=[0, 1, 2], help="Prompt compaction level (default: COMPACTION_LEVEL)")
+    parser.add_argument("--metrics", default=None, help="Write timing metrics here: JSON lines for .jsonl, else Prometheus text")
+    parser.add_argument("--zip", default=None, help="Also bundle every tailored PDF and its plain text into this ZIP")
+    parser.add_argument("--export-workers", type=int, default=None, help="Processes used to render PDFs for --zip")
+    args = parser.parse_args(argv)
+    if args.compaction is not None:
+        compaction.COMPACTION_LEVEL = args.compaction
+    # Gemini calls are throttled by the process-wide limiter shared with the app code
+    llm.configure_limits(requests_per_minute=args.rpm, tokens_per_minute=args.tpm, max_concurrency=args.concurrency)
+
+    data = run_batch(
+        args.resume_dir,
+        args.rfp,
+        args.out,
+        concurrency=args.concurrency,
+        extract_workers=args.extract_workers,
+        top=args.top,
+    )
+    if args.zip:
+        started = time.perf_counter()
+        count = bundle_outputs(args.out, data, args.zip, workers=args.export_workers)
+        print(f"Bundled {count} resumes into {args.zip} in {time.perf_counter() - started:.1f}s")
+    if args.metrics:
+        metrics.write_export(args.metrics)
+    llm_stats = llm.metrics()
+    print(
+        f"Gemini calls: {llm_stats['calls']}, retries: {llm_stats['retries']}, "
+        f"rate limit wait: {llm_stats['rate_limit_wait_seconds']:.1f}s"
+    )
+    statuses = Counter(entry.get("status") for entry in data["resumes"].values())
+    failed = [name for name, entry in data["resumes"].items() if entry.get("status") == "failed"]
+    print(f"Done: {statuses['ok']} ok, {statuses['filtered']} filtered, {len(failed)} failed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
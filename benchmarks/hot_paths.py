@@ -0,0 +1,259 @@
+"""
+Reproducible benchmark suite for the non-LLM hot paths, compared against a stored baseline.
+
+    python benchmarks/hot_paths.py
+    python benchmarks/hot_paths.py --quick
+    python benchmarks/hot_paths.py --update-baseline
+
+Generates a seeded corpus: resume and RFP PDFs from 1 to 500 pages and
+model-style markdown resumes of increasing length. Then it times
+extract_text_from_pdf on the PDFs and clean_markdown,
+clean_text_for_download and markdown_to_pdf_reportlab on the markdown.
+The parse and render memos are disabled so every call does the full work.
+
+Each function and input gets p50/p95 latency, throughput (pages or
+characters per second at p50) and peak memory. Peak memory is measured by
+tracemalloc in a separate run, so it does not slow the timed ones, and only
+covers this process, so extraction runs inline unless --workers is given.
+Results are written as JSON and compared with
+benchmarks/baselines/hot_paths.json. The run exits non-zero if a p50 or a
+peak is more than --tolerance above the baseline.
+Baseline latencies are scaled by a short calibration loop timed on both
+machines; still, compare on the kind of machine the baseline was stored on,
+and refresh it with --update-baseline after intended changes. Runs fully
+offline.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import markdown_doc  # noqa: E402
+import reportlab  # noqa: E402
+from pdf_render import get_renderer  # noqa: E402
+from prompt_compaction import TOPICS, build_pdf, synthetic_sentences  # noqa: E402
+from tailoring import clean_markdown, clean_text_for_download, extract_text_from_pdf, markdown_to_pdf_reportlab  # noqa: E402
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "hot_paths.json")
+PAGE_COUNTS = (1, 10, 50, 200, 500)
+ROLE_COUNTS = (2, 8, 32, 128, 512)
+QUICK_PAGE_COUNTS = (1, 10, 50)
+QUICK_ROLE_COUNTS = (2, 8, 32)
+# Differences below these are noise whatever the ratio
+MIN_SECONDS_REGRESSION = 0.005
+MIN_BYTES_REGRESSION = 256 * 1024
+
+
+def resume_sentences(count, seed):
+    rng = random.Random(seed)
+    return [
+        f"Delivered {rng.choice(TOPICS)} for a {rng.choice(['bank', 'retailer', 'ministry', 'insurer'])} "
+        f"with a team of {rng.randint(3, 40)}, cutting costs by {rng.randint(5, 45)}% over {rng.randint(2, 30)} months."
+        for _ in range(count)
+    ]
+
+
+def model_markdown(roles, seed):
+    """A condensed resume in the loose markdown the model returns: a code fence, * bullets, blank-line runs."""
+    rng = random.Random(seed)
+    lines = ["```markdown", "#Jordan Taylor", "jordan.taylor@example.com | +1 555 0100", "", "",
+             "##Professional Summary", f"Consultant with **{rng.randint(6, 20)} years** of experience.  ", ""]
+    for role in range(roles):
+        lines += [f"### Senior Consultant | Client {role} | {2024 - role} - {2025 - role} |", ""]
+        for _ in range(rng.randint(3, 6)):
+            marker = rng.choice(["-", "*", "+"])
+            lines.append(f"{marker} Led *{rng.choice(TOPICS)}* work that saved **${rng.randint(1, 9)}M** "
+                         f"and cut delivery time by {rng.randint(10, 45)}% `on time`")
+        lines += ["", ""]
+    lines += ["## Education", "- **MSc Computer Science**, State University", "```"]
+    return "\n".join(lines)
+
+
+def build_corpus(page_counts, role_counts, seed):
+    """Return [(function name, input name, size, unit, argument)] for every benchmark case."""
+    cases = []
+    for pages in page_counts:
+        for kind, sentences in (("resume", resume_sentences(pages * 8, seed)),
+                                ("rfp", synthetic_sentences(pages * 8, seed + 1))):
+            data = build_pdf(sentences, pages, f"{kind.upper()} {seed}")
+            cases.append(("extract_text_from_pdf", f"{kind}-{pages}p", pages, "pages", data))
+    for roles in role_counts:
+        text = model_markdown(roles, seed)
+        cleaned = clean_markdown(text)
+        name = f"markdown-{roles}roles"
+        cases.append(("clean_markdown", name, len(text), "chars", text))
+        cases.append(("clean_text_for_download", name, len(cleaned), "chars", cleaned))
+        cases.append(("markdown_to_pdf_reportlab", name, len(cleaned), "chars", cleaned))
+    return cases
+
+
+FUNCTIONS = {
+    "extract_text_from_pdf": lambda data, workers: extract_text_from_pdf(data, max_pages=None, workers=workers),
+    "clean_markdown": lambda text, workers: clean_markdown(text),
+    "clean_text_for_download": lambda text, workers: clean_text_for_download(text),
+    "markdown_to_pdf_reportlab": lambda text, workers: markdown_to_pdf_reportlab(text),
+}
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def measure(function_name, argument, repeat, workers):
+    """Return (latencies in seconds, peak traced bytes) for one function on one input."""
+    func = FUNCTIONS[function_name]
+    # One untimed call warms imports, styles and the extraction pool
+    func(argument, workers)
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(argument, workers)
+        latencies.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    try:
+        func(argument, workers)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return latencies, peak
+
+
+def calibrate(rounds=15):
+    """
+    Fastest of several timings of a fixed pure-Python workload, used to scale the baseline to this machine.
+
+    The minimum is the timing least disturbed by other load on the machine.
+    """
+    text = model_markdown(16, seed=0)
+    times = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for _ in range(20):
+            markdown_doc.Document(text).normalized().to_plain_text()
+        times.append(time.perf_counter() - started)
+    return min(times)
+
+
+def run_suite(cases, repeat, workers):
+    results = []
+    print(f"{'function':<27}{'input':<20}{'p50 ms':>10}{'p95 ms':>10}{'throughput':>16}{'peak MB':>10}")
+    for function_name, input_name, size, unit, argument in cases:
+        latencies, peak = measure(function_name, argument, repeat, workers)
+        p50 = statistics.median(latencies)
+        result = {
+            "function": function_name,
+            "input": input_name,
+            "size": size,
+            "unit": unit,
+            "repeat": repeat,
+            "p50_seconds": p50,
+            "p95_seconds": percentile(latencies, 0.95),
+            "throughput": size / p50 if p50 else None,
+            "peak_memory_bytes": peak,
+        }
+        results.append(result)
+        print(f"{function_name:<27}{input_name:<20}{p50 * 1000:>10.2f}{result['p95_seconds'] * 1000:>10.2f}"
+              f"{result['throughput'] or 0:>10.0f} {unit}/s{peak / 1e6:>8.1f}")
+    return results
+
+
+def compare(results, baseline, tolerance, speed_factor=1.0):
+    """
+    Return descriptions of p50 latencies and peaks more than tolerance above the baseline.
+
+    Baseline latencies are multiplied by speed_factor, the ratio of this
+    run's calibration time to the baseline's, so a uniformly slower machine
+    is not reported as a regression.
+    """
+    previous = {(entry["function"], entry["input"]): entry for entry in baseline["results"]}
+    regressions = []
+    for result in results:
+        before = previous.get((result["function"], result["input"]))
+        if before is None:
+            continue
+        for field, floor in (("p50_seconds", MIN_SECONDS_REGRESSION), ("peak_memory_bytes", MIN_BYTES_REGRESSION)):
+            old, new = before[field], result[field]
+            if field == "p50_seconds":
+                old *= speed_factor
+            if new > old * (1 + tolerance) and new - old > floor:
+                regressions.append(f"{result['function']} {result['input']}: {field} {old:.4g} -> {new:.4g} "
+                                   f"(+{(new / old - 1) if old else float('inf'):.0%})")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the non-LLM hot paths against a stored baseline.")
+    parser.add_argument("--quick", action="store_true", help="Only PDFs up to 50 pages and shorter markdown")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed calls per function and input")
+    parser.add_argument("--seed", type=int, default=2024, help="Seed of the generated corpus")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Extraction processes; 1 reads pages inline, which times more reproducibly than a pool")
+    parser.add_argument("--output", default="hot_paths_results.json", help="Where to write this run's results")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Baseline to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown or memory growth, as a fraction")
+    parser.add_argument("--update-baseline", action="store_true", help="Store this run as the new baseline")
+    args = parser.parse_args(argv)
+
+    # Every call is timed cold: no reuse of parsed markdown or rendered PDFs between calls
+    markdown_doc.PARSE_CACHE_SIZE = 0
+    get_renderer().cache_size = 0
+
+    page_counts, role_counts = (QUICK_PAGE_COUNTS, QUICK_ROLE_COUNTS) if args.quick else (PAGE_COUNTS, ROLE_COUNTS)
+    started = time.perf_counter()
+    cases = build_corpus(page_counts, role_counts, args.seed)
+    print(f"Corpus: {len(cases)} cases generated in {time.perf_counter() - started:.1f}s\n")
+    calibration = calibrate()
+    print(f"Calibration: {calibration * 1000:.1f} ms\n")
+    results = run_suite(cases, args.repeat, args.workers)
+
+    report = {
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "reportlab": reportlab.Version,
+        },
+        "settings": {"quick": args.quick, "repeat": args.repeat, "seed": args.seed, "workers": args.workers},
+        "calibration_seconds": calibration,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.update_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline updated: {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --update-baseline to store one")
+        return 0
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    speed_factor = calibration / baseline["calibration_seconds"]
+    regressions = compare(results, baseline, args.tolerance, speed_factor)
+    print(f"Compared with {args.baseline} (this machine runs at {1 / speed_factor:.2f}x its speed): "
+          f"{len(regressions)} regressions beyond {args.tolerance:.0%}")
+    for regression in regressions:
+        print(f"  {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
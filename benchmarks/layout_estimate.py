@@ -0,0 +1,97 @@
+"""
+Accuracy check and speed benchmark for the layout estimator.
+
+    python benchmarks/layout_estimate.py
+    python benchmarks/layout_estimate.py --documents 200 --edits 20
+
+Every document in golden/markdown_corpus.json plus a batch of stub resumes of
+increasing length is measured with ResumePdfRenderer.estimate_layout and then
+fully rendered, and the estimated page count is compared with the page count
+of the PDF. Then one resume is edited line by line, timing the estimate after
+each edit against a full render, as the page-count indicator does while the
+markdown is being fitted. Exits non-zero if any page count differs.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from io import BytesIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backends import StubBackend  # noqa: E402
+from pdf_render import ResumePdfRenderer  # noqa: E402
+from PyPDF2 import PdfReader  # noqa: E402
+
+GOLDEN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "golden", "markdown_corpus.json")
+TECHNOLOGIES = ["Python", "Azure", "AWS", "Kubernetes", "SAP", "Salesforce", "TOGAF", "Java", "Terraform",
+                "Snowflake", "PMP", "ITIL", "Scrum", "Kafka", "React"]
+
+
+def stub_resumes(count, seed=7):
+    """Concise resumes from the stub model, from two to about six roles long."""
+    rng = random.Random(seed)
+    backend = StubBackend(latency=0, tokens_per_second=0)
+    resumes = []
+    for index in range(count):
+        words = " ".join(rng.choice(TECHNOLOGIES) for _ in range(rng.randint(200, 9000)))
+        prompt = f"Here is the full consultant Resume:\nCandidate {index}\n{words}\nBegin the formatted resume"
+        resumes.append(backend.respond(prompt))
+    return resumes
+
+
+def check_accuracy(renderer, documents):
+    mismatches = 0
+    for document in documents:
+        estimated = renderer.estimate_layout(document).pages
+        actual = len(PdfReader(BytesIO(renderer._build(document))).pages)
+        if estimated != actual:
+            mismatches += 1
+            print(f"  estimated {estimated} pages, rendered {actual}: {document[:60]!r}")
+    print(f"Page counts: {len(documents) - mismatches} of {len(documents)} documents match")
+    return mismatches
+
+
+def benchmark_edits(document, edits):
+    """Time estimates and full renders of a document edited one line at a time, on fresh renderers."""
+    estimating, rendering = ResumePdfRenderer(cache_size=0), ResumePdfRenderer(cache_size=0)
+    lines = document.split("\n")
+    estimate_times, render_times = [], []
+    for edit in range(edits):
+        index = edit % len(lines)
+        if lines[index].startswith("- "):
+            lines[index] += " and more"
+        text = "\n".join(lines)
+
+        started = time.perf_counter()
+        estimating.estimate_layout(text)
+        estimate_times.append(time.perf_counter() - started)
+        started = time.perf_counter()
+        rendering.render(text)
+        render_times.append(time.perf_counter() - started)
+
+    print(f"\nEditing loop: {edits} edits of a {len(document)}-character resume")
+    print(f"{'':>10}{'first ms':>10}{'median ms':>11}")
+    for name, times in (("estimate", estimate_times), ("render", render_times)):
+        print(f"{name:>10}{times[0] * 1000:>10.1f}{statistics.median(times[1:] or times) * 1000:>11.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check and benchmark the layout estimator.")
+    parser.add_argument("--documents", type=int, default=60, help="Stub resumes added to the golden corpus")
+    parser.add_argument("--edits", type=int, default=30, help="Edits timed in the editing loop")
+    args = parser.parse_args(argv)
+
+    with open(GOLDEN_PATH, encoding="utf-8") as f:
+        golden = [entry["input"] for entry in json.load(f)]
+    resumes = stub_resumes(args.documents)
+    mismatches = check_accuracy(ResumePdfRenderer(cache_size=0), golden + resumes)
+    benchmark_edits(max(resumes, key=len), args.edits)
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
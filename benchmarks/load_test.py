@@ -0,0 +1,375 @@
+"""
+Concurrent-session load test of the Streamlit app against the stub model.
+
+    python benchmarks/load_test.py
+    python benchmarks/load_test.py --levels 1,4,16,32 --workers 2 --latency 2
+
+Each simulated session drives the real app.py through Streamlit's AppTest
+harness: open the page, upload a resume, upload an RFP, press Process RFP
+and Process Resume (waiting for each background job as the page polls it),
+then Generate PDF. Uploads are served by a patched st.file_uploader with a
+distinct generated resume and RFP per session, and the model is the stub
+backend with the configured latency, so the run is fully offline.
+
+Sessions are spread over --workers processes, each standing in for one
+Streamlit server process: its sessions run on threads and share its job
+queue, caches and model limits. For every level of concurrent sessions the
+harness reports per-step latency percentiles, completed flows per minute
+and each worker's CPU use and RSS, and names the level after which adding
+sessions stops raising throughput.
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import resource
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(ROOT, "app.py")
+STEPS = ("open", "upload_resume", "upload_rfp", "process_rfp", "process_resume", "generate_pdf")
+# Steps that are plain reruns of the page; their latency is what users feel as a stalled app
+RERUN_STEPS = ("open", "upload_resume", "upload_rfp")
+# A level raises throughput meaningfully only if it completes this much more than the previous one
+SATURATION_GAIN = 1.1
+
+TECHNOLOGIES = ["Python", "Azure", "AWS", "Kubernetes", "SAP", "Salesforce", "TOGAF", "Java", "Terraform",
+                "Snowflake", "PMP", "ITIL", "Scrum", "Kafka", "React"]
+
+
+def make_pdf(lines):
+    from reportlab.lib.pagesizes import letter
+    from reportlab.pdfgen import canvas
+
+    buffer = BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=letter)
+    y = 750
+    for line in lines:
+        if y < 60:
+            pdf.showPage()
+            y = 750
+        pdf.drawString(72, y, line)
+        y -= 14
+    pdf.save()
+    return buffer.getvalue()
+
+
+def session_documents(index):
+    """A resume and an RFP unique to one session, so no session is served from another's caches."""
+    skills = [TECHNOLOGIES[(index + offset) % len(TECHNOLOGIES)] for offset in range(6)]
+    resume = [f"Candidate {index}", f"candidate{index}@example.com"] + [
+        f"{year}: delivered {skills[year % 6]} and {skills[(year + 1) % 6]} programmes for client {index}-{year}"
+        for year in range(2000, 2024)
+    ]
+    rfp = [f"Request for proposal {index}"] + [
+        f"Requirement {number}: {skills[number % 6]} expertise with {number % 9 + 3} years in regulated industries"
+        for number in range(60)
+    ]
+    return {"resume_uploader": make_pdf(resume), "rfp_uploader": make_pdf(rfp)}
+
+
+class FakeUpload:
+    """Stands in for Streamlit's UploadedFile; the app only reads name and getvalue()."""
+
+    def __init__(self, data, name):
+        self.data = data
+        self.name = name
+
+    def getvalue(self):
+        return self.data
+
+
+def install_uploader(documents):
+    """Patch st.file_uploader to return the current session's document once the session has 'uploaded' it."""
+    import streamlit as st
+
+    def file_uploader(label, type=None, key=None, **kwargs):
+        session = st.session_state.get("load_test_session")
+        if session is None or key not in st.session_state.get("load_test_uploads", ()):
+            return None
+        return FakeUpload(documents[session][key], f"{key}-{session}.pdf")
+
+    st.file_uploader = file_uploader
+
+
+def share_test_runtime():
+    """
+    Let AppTest sessions run concurrently in one process.
+
+    Every AppTest run installs a mock Runtime as the process-wide instance
+    and clears it when done, which pulls it from under runs still going on
+    other threads (widgets then lose their forms, for one). While no run has
+    one installed, a shared mock is used and the runtime still counts as
+    existing.
+
+    Every AppTest run also compiles the script again in a cache of its own,
+    and CPython 3.11 can fail compiling on two threads at once. All runs
+    share one script cache instead, as the sessions of a server do.
+    """
+    from unittest.mock import MagicMock
+
+    import streamlit.testing.v1.local_script_runner as local_script_runner
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+
+    shared = MagicMock(spec=Runtime)
+    shared.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    shared.cache_storage_manager = MemoryCacheStorageManager()
+    Runtime.instance = classmethod(lambda cls: cls._instance or shared)
+    Runtime.exists = classmethod(lambda cls: True)
+    script_cache = ScriptCache()
+    local_script_runner.ScriptCache = lambda: script_cache
+
+
+def button(at, label):
+    return next(widget for widget in at.button if widget.label == label)
+
+
+def run_session(index, timeout):
+    """Drive one session through the whole flow; returns {"steps": {step: seconds}, "error": message or None}."""
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    at.session_state["load_test_session"] = index
+    at.session_state["load_test_uploads"] = []
+    steps = {}
+
+    def wait_for_job(state_key):
+        deadline = time.monotonic() + timeout
+        while at.session_state[state_key] and time.monotonic() < deadline:
+            at.run()
+
+    actions = {
+        "open": lambda: at.run(),
+        "upload_resume": lambda: (at.session_state["load_test_uploads"].append("resume_uploader"), at.run()),
+        "upload_rfp": lambda: (at.session_state["load_test_uploads"].append("rfp_uploader"), at.run()),
+        "process_rfp": lambda: (button(at, "Process RFP").click().run(), wait_for_job("rfp_job_id")),
+        "process_resume": lambda: (button(at, "Process Resume").click().run(), wait_for_job("resume_job_id")),
+        "generate_pdf": lambda: button(at, "Generate PDF").click().run(),
+    }
+    try:
+        for step in STEPS:
+            started = time.perf_counter()
+            actions[step]()
+            steps[step] = time.perf_counter() - started
+            if at.exception:
+                raise RuntimeError(at.exception[0].message)
+        if not at.session_state["pdf_generated"]:
+            raise RuntimeError("No PDF was generated")
+    except Exception as e:
+        return {"steps": steps, "error": f"{type(e).__name__}: {e}"}
+    return {"steps": steps, "error": None}
+
+
+def _rss_bytes():
+    # Linux only; other platforms report just the peak
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+def worker_main(connection, session_indexes, timeout):
+    """One simulated server process: run its sessions concurrently on threads and report its resource use."""
+    sys.path.insert(0, ROOT)
+    # The harness threads read session state outside a script run, which Streamlit warns about on every access;
+    # a filter outlasts the log levels Streamlit resets
+    logging.getLogger("streamlit.runtime.scriptrunner.script_run_context").addFilter(
+        lambda record: "missing ScriptRunContext" not in record.getMessage()
+    )
+    documents = {index: session_documents(index) for index in session_indexes}
+    install_uploader(documents)
+    share_test_runtime()
+
+    # An untimed first page load imports the app's modules, as a running server already has
+    _warm_up(timeout)
+    connection.send("ready")
+    connection.recv()
+
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    cpu_started = usage.ru_utime + usage.ru_stime
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(session_indexes)) as executor:
+        sessions = list(executor.map(lambda index: run_session(index, timeout), session_indexes))
+    wall = time.perf_counter() - started
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    connection.send({
+        "sessions": sessions,
+        "wall_seconds": wall,
+        "cpu_seconds": usage.ru_utime + usage.ru_stime - cpu_started,
+        "rss_bytes": _rss_bytes(),
+        # ru_maxrss is in kilobytes on Linux
+        "peak_rss_bytes": usage.ru_maxrss * 1024,
+    })
+    connection.close()
+
+
+def _warm_up(timeout):
+    from streamlit.testing.v1 import AppTest
+
+    AppTest.from_file(APP_PATH, default_timeout=timeout).run()
+
+
+def run_level(sessions, workers, first_index, timeout):
+    """Run one level of concurrent sessions over the worker processes; returns the workers' reports and wall time."""
+    context = multiprocessing.get_context("spawn")
+    workers = min(workers, sessions)
+    processes = []
+    for worker in range(workers):
+        indexes = list(range(first_index + worker, first_index + sessions, workers))
+        parent, child = context.Pipe()
+        process = context.Process(target=worker_main, args=(child, indexes, timeout))
+        process.start()
+        processes.append((process, parent))
+
+    # Start every worker's sessions together once all of them have loaded the app
+    for _, parent in processes:
+        parent.recv()
+    started = time.perf_counter()
+    for _, parent in processes:
+        parent.send("start")
+    reports = [parent.recv() for _, parent in processes]
+    wall = time.perf_counter() - started
+    for process, _ in processes:
+        process.join()
+    return reports, wall
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    position = (len(ordered) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def summarize(sessions, workers, reports, wall):
+    flows = [session for report in reports for session in report["sessions"]]
+    completed = [flow for flow in flows if flow["error"] is None]
+    steps = {}
+    for step in STEPS:
+        latencies = [flow["steps"][step] for flow in completed]
+        steps[step] = {
+            "p50_seconds": statistics.median(latencies) if latencies else None,
+            "p95_seconds": percentile(latencies, 0.95),
+            "max_seconds": max(latencies) if latencies else None,
+        }
+    return {
+        "sessions": sessions,
+        "workers": len(reports),
+        "wall_seconds": wall,
+        "completed": len(completed),
+        "errors": sorted({flow["error"] for flow in flows if flow["error"]}),
+        "flows_per_minute": 60 * len(completed) / wall if wall else 0.0,
+        "steps": steps,
+        "worker_resources": [
+            {
+                "cpu_seconds": report["cpu_seconds"],
+                "cpu_utilization": report["cpu_seconds"] / report["wall_seconds"] if report["wall_seconds"] else 0.0,
+                "rss_bytes": report["rss_bytes"],
+                "peak_rss_bytes": report["peak_rss_bytes"],
+            }
+            for report in reports
+        ],
+    }
+
+
+def saturation_level(levels):
+    """Return the level after which more sessions no longer raise throughput by SATURATION_GAIN, or None."""
+    for current, following in zip(levels, levels[1:]):
+        if following["flows_per_minute"] < current["flows_per_minute"] * SATURATION_GAIN:
+            return current
+    return None
+
+
+def print_level(level):
+    def ms(value):
+        return f"{value * 1000:9.0f}" if value is not None else f"{'-':>9}"
+
+    print(f"\n{level['sessions']} sessions on {level['workers']} workers: {level['completed']} flows in "
+          f"{level['wall_seconds']:.1f}s, {level['flows_per_minute']:.1f} flows/min")
+    print(f"{'step':<16}{'p50 ms':>9}{'p95 ms':>9}{'max ms':>9}")
+    for step in STEPS:
+        stats = level["steps"][step]
+        print(f"{step:<16}{ms(stats['p50_seconds'])}{ms(stats['p95_seconds'])}{ms(stats['max_seconds'])}")
+    for worker, resources in enumerate(level["worker_resources"]):
+        rss = resources["rss_bytes"]
+        print(f"worker {worker}: CPU {resources['cpu_seconds']:.1f}s ({resources['cpu_utilization']:.0%}), "
+              f"RSS {rss / 1e6 if rss else 0:.0f} MB, peak {resources['peak_rss_bytes'] / 1e6:.0f} MB")
+    for error in level["errors"]:
+        print(f"  error: {error}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the Streamlit app with concurrent simulated sessions.")
+    parser.add_argument("--levels", default="1,2,4,8,16", help="Comma-separated numbers of concurrent sessions")
+    parser.add_argument("--workers", type=int, default=1, help="Server processes the sessions are spread over")
+    parser.add_argument("--latency", type=float, default=1.0, help="Stub model seconds before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=250, help="Stub model output speed (0: instant)")
+    parser.add_argument("--poll-interval", type=float, default=None, help="JOB_POLL_INTERVAL for the app")
+    parser.add_argument("--requests-per-minute", type=float, default=100000,
+                        help="Model request quota per worker; the stub has none, pass the production one to include it")
+    parser.add_argument("--timeout", type=float, default=300, help="Seconds one session step may take")
+    parser.add_argument("--output", default=None, help="Write the results as JSON to this path")
+    args = parser.parse_args(argv)
+
+    # Spawned workers inherit these before they import the app
+    cache_dir = tempfile.mkdtemp(prefix="load_test_cache_")
+    os.environ.update(
+        LLM_BACKEND="stub",
+        LLM_STUB_LATENCY=str(args.latency),
+        LLM_STUB_TOKENS_PER_SECOND=str(args.tokens_per_second),
+        LLM_REQUESTS_PER_MINUTE=str(args.requests_per_minute),
+        RESPONSE_CACHE_ENABLED="0",
+        CACHE_DIR=cache_dir,
+    )
+    if args.poll_interval is not None:
+        os.environ["JOB_POLL_INTERVAL"] = str(args.poll_interval)
+
+    levels = []
+    first_index = 0
+    for sessions in (int(level) for level in args.levels.split(",")):
+        reports, wall = run_level(sessions, args.workers, first_index, args.timeout)
+        first_index += sessions
+        levels.append(summarize(sessions, args.workers, reports, wall))
+        print_level(levels[-1])
+
+    saturated = saturation_level(levels)
+    baseline_rerun = max(levels[0]["steps"][step]["p95_seconds"] or 0 for step in RERUN_STEPS)
+    print()
+    if saturated:
+        print(f"Throughput saturates at about {saturated['sessions']} concurrent sessions "
+              f"({saturated['flows_per_minute']:.1f} flows/min).")
+    else:
+        print("Throughput was still rising at the largest level; add larger levels to find the limit.")
+    for level in levels:
+        rerun = max(level["steps"][step]["p95_seconds"] or 0 for step in RERUN_STEPS)
+        if baseline_rerun:
+            print(f"  {level['sessions']:>4} sessions: p95 page rerun {rerun * 1000:.0f} ms "
+                  f"({rerun / baseline_rerun:.1f}x the single-session level)")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({
+                "settings": vars(args),
+                "levels": levels,
+                "saturated_at": saturated["sessions"] if saturated else None,
+            }, f, indent=2)
+        print(f"\nResults written to {args.output}")
+    return 1 if any(level["errors"] for level in levels) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
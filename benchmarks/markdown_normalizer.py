@@ -0,0 +1,137 @@
+"""
+Golden-corpus check and speed benchmark for the single-pass markdown normalizer.
+
+    python benchmarks/markdown_normalizer.py
+    python benchmarks/markdown_normalizer.py --documents 2000 --reruns 5
+
+First every document in golden/markdown_corpus.json is run through
+clean_markdown, clean_text_for_download and the PDF renderer's flowables and
+compared with the outputs recorded from the original regex implementation.
+Then a batch of documents is post-processed with the original regex passes
+and with markdown_doc, once cold and then for each rerun of the results tab.
+Exits non-zero if any golden output differs.
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import markdown_doc  # noqa: E402
+from backends import StubBackend  # noqa: E402
+from pdf_render import ResumePdfRenderer  # noqa: E402
+from reportlab.platypus import Spacer  # noqa: E402
+
+GOLDEN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "golden", "markdown_corpus.json")
+TECHNOLOGIES = ["Python", "Azure", "AWS", "Kubernetes", "SAP", "Salesforce", "TOGAF", "Java", "Terraform",
+                "Snowflake", "PMP", "ITIL", "Scrum", "Kafka", "React"]
+
+
+def flowable_signature(flowables):
+    """Describe flowables as (style, text) and ("spacer", height) pairs, as recorded in the golden corpus."""
+    return [["spacer", f.height] if isinstance(f, Spacer) else [f.style.name, f.text] for f in flowables]
+
+
+def legacy_pdf_inline(markdown_text):
+    """The original per-line inliner of markdown_to_pdf_reportlab: three substitutions per line."""
+    lines = []
+    for line in markdown_text.split('\n'):
+        line = line.strip()
+        line = re.sub(r'\*\*(.*?)\*\*', r'<b>\1</b>', line)
+        line = re.sub(r'\*(.*?)\*', r'<i>\1</i>', line)
+        line = re.sub(r'`(.*?)`', r'<font face="Courier">\1</font>', line)
+        lines.append(line)
+    return lines
+
+
+def check_golden(path=GOLDEN_PATH):
+    """Compare every output with the golden corpus and return the list of mismatches."""
+    with open(path, encoding="utf-8") as f:
+        corpus = json.load(f)
+    renderer = ResumePdfRenderer(cache_size=0)
+    mismatches = []
+    for entry in corpus:
+        document = markdown_doc.Document(entry["input"])
+        cleaned = document.normalized().to_markdown()
+        if cleaned != entry["clean_markdown"]:
+            mismatches.append((entry["name"], "clean_markdown"))
+        if document.to_plain_text() != entry["plain_text"]:
+            mismatches.append((entry["name"], "plain_text"))
+        flowables = flowable_signature(renderer.build_flowables(cleaned))
+        if flowables != entry["pdf_flowables"]:
+            mismatches.append((entry["name"], "pdf_flowables"))
+    print(f"Golden corpus: {len(corpus)} documents, {len(mismatches)} mismatches")
+    for name, output in mismatches:
+        print(f"  {name}: {output} differs")
+    return mismatches
+
+
+def synthetic_documents(count, seed=0):
+    """Return count distinct resume-sized markdown documents in the shape the model produces."""
+    rng = random.Random(seed)
+    stub = StubBackend(latency=0, tokens_per_second=0)
+    documents = []
+    for index in range(count):
+        resume = f"Consultant {index}\n" + " ".join(rng.choice(TECHNOLOGIES) + " delivery" for _ in range(400))
+        documents.append(stub.respond(f"Here is the full consultant Resume:\n{resume}\nBegin the formatted"))
+    return documents
+
+
+def run_legacy(documents):
+    for text in documents:
+        cleaned = markdown_doc.legacy_clean_markdown(text)
+        legacy_pdf_inline(cleaned)
+        markdown_doc.legacy_clean_text_for_download(cleaned)
+
+
+def run_single_pass(documents):
+    for text in documents:
+        cleaned = markdown_doc.parse(text).normalized()
+        cleaned.pdf_blocks()
+        cleaned.to_plain_text()
+
+
+def timed(func, documents):
+    started = time.perf_counter()
+    func(documents)
+    return time.perf_counter() - started
+
+
+def benchmark(count, reruns):
+    """Time the cold batch and the results-tab reruns for both implementations."""
+    documents = synthetic_documents(count)
+    size = sum(len(text) for text in documents)
+    print(f"Batch: {count} documents, {size / 1e6:.1f} MB of markdown, {reruns} reruns")
+    # Keep every document of the batch parsed so reruns see the same reuse the app does
+    markdown_doc.PARSE_CACHE_SIZE = max(markdown_doc.PARSE_CACHE_SIZE, 2 * count)
+
+    legacy_cold = timed(run_legacy, documents)
+    legacy_rerun = sum(timed(run_legacy, documents) for _ in range(reruns))
+    single_cold = timed(run_single_pass, documents)
+    single_rerun = sum(timed(run_single_pass, documents) for _ in range(reruns))
+
+    print(f"{'':12}{'regex passes':>14}{'single pass':>14}{'speedup':>10}")
+    for label, legacy, single in (("cold", legacy_cold, single_cold), ("reruns", legacy_rerun, single_rerun),
+                                  ("total", legacy_cold + legacy_rerun, single_cold + single_rerun)):
+        print(f"{label:12}{legacy:13.3f}s{single:13.3f}s{legacy / max(single, 1e-9):9.1f}x")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check and benchmark the single-pass markdown normalizer.")
+    parser.add_argument("--documents", type=int, default=1000, help="Documents in the benchmark batch")
+    parser.add_argument("--reruns", type=int, default=3, help="Results-tab reruns timed after the cold pass")
+    parser.add_argument("--check-only", action="store_true", help="Only compare with the golden corpus")
+    args = parser.parse_args(argv)
+
+    mismatches = check_golden()
+    if not args.check_only:
+        benchmark(args.documents, args.reruns)
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
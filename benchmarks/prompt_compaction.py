@@ -0,0 +1,114 @@
+"""
+Measure how many prompt tokens compaction saves on a synthetic RFP and resume.
+
+    python benchmarks/prompt_compaction.py
+    python benchmarks/prompt_compaction.py --pages 120
+
+Builds PDFs with a running header, a footer with page numbers, wrapped and
+hyphenated body text and a repeated disclaimer, extracts them the way the app
+does, and prints characters, estimated tokens and compaction time at every
+level. It also checks that each body sentence survives compaction. Exits
+non-zero if one is lost.
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import textwrap
+import time
+from io import BytesIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pdf_text  # noqa: E402
+from compaction import compact_document  # noqa: E402
+from reportlab.lib.pagesizes import letter  # noqa: E402
+from reportlab.pdfgen import canvas  # noqa: E402
+
+TOPICS = ["cloud migration", "data governance", "identity management", "payment processing", "service management",
+          "network modernization", "analytics platforms", "mobile delivery", "security operations", "ERP rollout"]
+DISCLAIMER = "This document is confidential and intended solely for the addressee."
+
+
+def synthetic_sentences(count, seed):
+    rng = random.Random(seed)
+    return [
+        f"Requirement {index}: the consultant shall demonstrate {rng.randint(3, 15)} years of "
+        f"{rng.choice(TOPICS)} experience including {rng.choice(TOPICS)} for regulated public sector clients."
+        for index in range(count)
+    ]
+
+
+def build_pdf(sentences, pages, title):
+    """Lay sentences out over pages with a header, footer, page numbers and a repeated disclaimer."""
+    buffer = BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=letter)
+    per_page = max(1, len(sentences) // pages)
+    for page in range(pages):
+        pdf.drawString(72, 750, f"{title} - Issued 2024")
+        y = 720
+        body = " ".join(sentences[page * per_page:(page + 1) * per_page])
+        lines = textwrap.wrap(body, 90, break_on_hyphens=False)
+        for index, line in enumerate(lines):
+            # Hyphenate a long word at the start of the next line onto this one, as typeset documents do
+            following = lines[index + 1].split(" ", 1) if index + 1 < len(lines) else [""]
+            if len(following[0]) > 9 and following[0].isalpha():
+                line += " " + following[0][:5] + "-"
+                lines[index + 1] = following[0][5:] + (" " + following[1] if len(following) > 1 else "")
+            pdf.drawString(72, y, line)
+            y -= 14
+        if page % 3 == 0:
+            pdf.drawString(72, y - 14, DISCLAIMER)
+        pdf.drawString(72, 40, f"Page {page + 1} of {pages}")
+        pdf.showPage()
+    pdf.save()
+    return buffer.getvalue()
+
+
+def measure(name, data):
+    text = pdf_text.extract_text(data, workers=1, page_break=pdf_text.PAGE_BREAK)
+    print(f"\n{name}")
+    print(f"{'level':>6}{'chars':>10}{'tokens':>10}{'saved':>8}{'ms':>8}")
+    outputs = {}
+    for level in (0, 1, 2):
+        started = time.perf_counter()
+        compacted, stats = compact_document(text, level=level)
+        elapsed = (time.perf_counter() - started) * 1000
+        saved = 1 - stats["tokens_after"] / stats["tokens_before"]
+        print(f"{level:>6}{stats['chars_after']:>10}{stats['tokens_after']:>10}{saved:>7.1%}{elapsed:>8.1f}")
+        outputs[level] = compacted
+    return outputs
+
+
+def lost_sentences(sentences, outputs):
+    """Return the sentences that are in the level 0 text but missing from a compacted text."""
+    def words(text):
+        return re.sub(r'\s+', ' ', text)
+
+    lost = []
+    for level in (1, 2):
+        compacted = words(outputs[level])
+        lost.extend((level, sentence) for sentence in sentences if sentence not in compacted)
+    return lost
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure prompt compaction savings.")
+    parser.add_argument("--pages", type=int, default=40, help="Pages in the synthetic RFP")
+    args = parser.parse_args(argv)
+
+    lost = []
+    for name, pages, count, seed in (("RFP", args.pages, args.pages * 6, 1), ("Resume", 3, 18, 2)):
+        sentences = synthetic_sentences(count, seed)
+        outputs = measure(f"{name}: {pages} pages", build_pdf(sentences, pages, f"{name} 2024-17"))
+        lost.extend(lost_sentences(sentences, outputs))
+
+    print(f"\nSentences lost by compaction: {len(lost)}")
+    for level, sentence in lost[:5]:
+        print(f"  level {level}: {sentence}")
+    return 1 if lost else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
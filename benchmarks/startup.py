@@ -0,0 +1,116 @@
+"""
+Cold-start benchmark for the Streamlit app: import time and time to first render.
+
+    python benchmarks/startup.py
+    python benchmarks/startup.py --runs 10 --output startup.json
+
+Every measurement runs in a fresh Python process, as after a container
+starts. The import report runs `python -X importtime -c "import app"` and
+attributes the import time to top-level packages. The render benchmark
+times the first AppTest run of app.py from process start, in two modes:
+
+    lazy   as the app starts now: PyPDF2, ReportLab and google.generativeai
+           are left until first use or the background warm-up
+    eager  the same libraries loaded before the first page, by calling
+           app.warm_up() up front, as the module-level imports used to
+
+"ready" adds the warm-up to the lazy first render, i.e. when the first
+upload or model call no longer waits for an import. The background warm-up
+thread is disabled in the child processes so it cannot blur the timings.
+Runs fully offline; the Gemini client is created but never called.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FIRST_RENDER = """
+import json, sys, time
+started = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+import app
+if sys.argv[1] == "eager":
+    app.warm_up()
+at = AppTest.from_file({app_path!r}, default_timeout=60)
+at.run()
+first_render = time.perf_counter() - started
+if at.exception:
+    raise SystemExit(str(at.exception))
+if sys.argv[1] == "lazy":
+    app.warm_up()
+print(json.dumps({{"first_render": first_render, "ready": time.perf_counter() - started}}))
+"""
+
+
+def child_env():
+    env = dict(os.environ, WARM_UP="0")
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [ROOT, env.get("PYTHONPATH")]))
+    return env
+
+
+def import_report(top):
+    """Return (seconds to import app, [(package, seconds)] for the top packages by their own import time)."""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app"],
+        cwd=ROOT, env=child_env(), capture_output=True, text=True, check=True,
+    )
+    by_package = defaultdict(int)
+    total = 0
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        name = name.strip()
+        by_package[name.split(".")[0]] += int(self_us)
+        if name == "app":
+            total = int(cumulative_us)
+    packages = sorted(by_package.items(), key=lambda item: -item[1])[:top]
+    return total / 1e6, [(package, us / 1e6) for package, us in packages]
+
+
+def first_render(mode):
+    script = FIRST_RENDER.format(app_path=os.path.join(ROOT, "app.py"))
+    completed = subprocess.run(
+        [sys.executable, "-c", script, mode],
+        cwd=ROOT, env=child_env(), capture_output=True, text=True, check=True,
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the app's import time and time to first render.")
+    parser.add_argument("--runs", type=int, default=5, help="Cold processes per mode")
+    parser.add_argument("--top", type=int, default=10, help="Packages listed in the import report")
+    parser.add_argument("--output", help="Also write the results as JSON to this path")
+    args = parser.parse_args(argv)
+
+    import_seconds, packages = import_report(args.top)
+    print(f"import app: {import_seconds * 1000:.0f} ms")
+    for package, seconds in packages:
+        print(f"  {package:<30}{seconds * 1000:>8.0f} ms")
+
+    results = {"import_seconds": import_seconds, "import_packages": dict(packages)}
+    print(f"\n{'mode':<8}{'first render ms':>17}{'ready ms':>11}   (median of {args.runs} cold starts)")
+    for mode in ("eager", "lazy"):
+        runs = [first_render(mode) for _ in range(args.runs)]
+        render = statistics.median(run["first_render"] for run in runs)
+        ready = statistics.median(run["ready"] for run in runs)
+        results[mode] = {"first_render_seconds": render, "ready_seconds": ready, "runs": runs}
+        print(f"{mode:<8}{render * 1000:>17.0f}{ready * 1000:>11.0f}")
+
+    gain = results["eager"]["first_render_seconds"] - results["lazy"]["first_render_seconds"]
+    print(f"\nFirst render is {gain * 1000:.0f} ms sooner with lazy loading")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,359 @@
+import hashlib
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+# Cache location and limits, overridable per deployment
+CACHE_DIR = os.environ.get("CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache"))
+RESPONSE_CACHE_ENABLED = os.environ.get("RESPONSE_CACHE_ENABLED", "1") != "0"
+RESPONSE_CACHE_MAX_BYTES = int(os.environ.get("RESPONSE_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+RESPONSE_CACHE_TTL = float(os.environ.get("RESPONSE_CACHE_TTL", str(7 * 24 * 3600)))
+EXTRACTION_CACHE_MEMORY_BYTES = int(os.environ.get("EXTRACTION_CACHE_MEMORY_BYTES", str(64 * 1024 * 1024)))
+EXTRACTION_CACHE_TTL = float(os.environ.get("EXTRACTION_CACHE_TTL", str(7 * 24 * 3600)))
+EXTRACTION_CACHE_MAX_BYTES = int(os.environ.get("EXTRACTION_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+# Seconds between disk prunes of a BlobCache with a TTL or disk budget, checked when a blob is stored
+BLOB_PRUNE_INTERVAL = float(os.environ.get("BLOB_PRUNE_INTERVAL", "600"))
+
+
+def content_hash(data):
+    """Return the SHA-256 hex digest of a bytes payload."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def prompt_key(model_name, prompt):
+    """Return the content address of a prompt sent to a given model."""
+    digest = hashlib.sha256()
+    digest.update(model_name.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(prompt.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class ResponseCache:
+    """
+    On-disk LLM response cache keyed on model name plus a hash of the full prompt.
+
+    Entries live in a SQLite database in WAL mode so several Streamlit worker
+    processes can read and write it at once. Entries older than the TTL are
+    treated as misses, and the least recently used entries are evicted once
+    the stored responses exceed the size budget.
+    """
+
+    def __init__(self, path, max_bytes=RESPONSE_CACHE_MAX_BYTES, ttl=RESPONSE_CACHE_TTL):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY,"
+                " model TEXT NOT NULL,"
+                " value TEXT NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " created REAL NOT NULL,"
+                " accessed REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+
+    def _connect(self):
+        # sqlite3 connections may not be shared between threads, so keep one per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def get(self, model_name, prompt):
+        """Return the cached response for this prompt, or None on a miss."""
+        key = prompt_key(model_name, prompt)
+        conn = self._connect()
+        now = time.time()
+        row = conn.execute("SELECT value, created FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self._count("misses")
+            return None
+
+        value, created = row
+        if self.ttl and now - created > self.ttl:
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._count("misses")
+            return None
+
+        conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+        self._count("hits")
+        return value
+
+    def put(self, model_name, prompt, value):
+        """Store a response and evict least recently used entries beyond the size budget."""
+        key = prompt_key(model_name, prompt)
+        size = len(value.encode("utf-8"))
+        if self.max_bytes and size > self.max_bytes:
+            return
+
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, value, size, created, accessed)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model_name, value, size, now, now),
+            )
+            evicted = self._evict(conn)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        if evicted:
+            self._count("evictions", evicted)
+
+    def _evict(self, conn):
+        if not self.max_bytes:
+            return 0
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return 0
+
+        evicted = 0
+        for key, size in conn.execute("SELECT key, size FROM responses ORDER BY accessed ASC").fetchall():
+            if total <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            evicted += 1
+        return evicted
+
+    def clear(self):
+        """Remove every cached response."""
+        self._connect().execute("DELETE FROM responses")
+
+    def stats(self):
+        """Return hit/miss counters for this process plus the shared cache size."""
+        entries, total = self._connect().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": entries,
+                "bytes": total,
+            }
+
+
+@contextmanager
+def atomic_write(path):
+    """
+    Open a temporary file next to path for writing bytes, and move it over
+    path only once the block finishes, so readers never see a partial file.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            yield f
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def prune_directory(directory, ttl=None, disk_budget=None):
+    """
+    Delete the files under directory older than ttl seconds, then the oldest
+    ones until the rest fit in disk_budget bytes; returns the names removed.
+    """
+    files = []
+    for parent, _, names in os.walk(directory):
+        for name in names:
+            path = os.path.join(parent, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                # Removed meanwhile by another worker process
+                continue
+            files.append((stat.st_mtime, stat.st_size, path, name))
+    files.sort()
+
+    cutoff = time.time() - ttl if ttl else None
+    total = sum(size for _, size, _, _ in files)
+    removed = []
+    for mtime, size, path, name in files:
+        if (cutoff is None or mtime >= cutoff) and (not disk_budget or total <= disk_budget):
+            break
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+        total -= size
+        removed.append(name)
+    return removed
+
+
+class BlobCache:
+    """
+    Content-addressed blob store held in memory up to a byte budget, with a disk spill.
+
+    Every blob is also written to its own file under the cache directory, so
+    entries evicted from memory (and entries written by other worker
+    processes) are reloaded from disk instead of being recomputed. Files
+    older than ttl seconds are deleted, and beyond disk_budget bytes the
+    oldest files go first; both are checked on creation and then every
+    BLOB_PRUNE_INTERVAL seconds when a blob is stored. Reading or storing a
+    blob refreshes its file's mtime, so age is counted from its last use.
+    """
+
+    def __init__(self, directory, memory_budget, ttl=None, disk_budget=None):
+        self.directory = directory
+        self.memory_budget = memory_budget
+        self.ttl = ttl
+        self.disk_budget = disk_budget
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._last_prune = time.monotonic()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.pruned = 0
+        os.makedirs(directory, exist_ok=True)
+        if ttl or disk_budget:
+            self.prune()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    def _remember(self, key, data):
+        # Caller holds the lock
+        if key in self._memory:
+            self._memory_bytes -= len(self._memory.pop(key))
+        if len(data) > self.memory_budget:
+            return
+        self._memory[key] = data
+        self._memory_bytes += len(data)
+        while self._memory_bytes > self.memory_budget:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    def _touch(self, key):
+        """Mark a blob's file as just used so pruning keeps it; False if there is no file."""
+        try:
+            os.utime(self._path(key))
+            return True
+        except OSError:
+            return False
+
+    def get(self, key):
+        """Return the blob stored under key, or None if neither memory nor disk has it."""
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+        if data is not None:
+            self._touch(key)
+            return data
+
+        try:
+            with open(self._path(key), "rb") as f:
+                data = f.read()
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+        self._touch(key)
+
+        with self._lock:
+            self._remember(key, data)
+            self.disk_hits += 1
+        return data
+
+    def put(self, key, data):
+        """Store a blob in memory and write it through to disk."""
+        path = self._path(key)
+        if not self._touch(key):
+            with atomic_write(path) as f:
+                f.write(data)
+
+        with self._lock:
+            self._remember(key, data)
+            prune = (self.ttl or self.disk_budget) and time.monotonic() - self._last_prune > BLOB_PRUNE_INTERVAL
+        if prune:
+            self.prune()
+
+    def prune(self):
+        """Delete files older than the TTL, then the oldest files beyond the disk budget; returns how many."""
+        with self._lock:
+            self._last_prune = time.monotonic()
+        removed = prune_directory(self.directory, ttl=self.ttl, disk_budget=self.disk_budget)
+        with self._lock:
+            for key in removed:
+                data = self._memory.pop(key, None)
+                if data is not None:
+                    self._memory_bytes -= len(data)
+            self.pruned += len(removed)
+        return len(removed)
+
+    def stats(self):
+        """Return hit/miss counters and the current memory footprint."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "pruned": self.pruned,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+            }
+
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+_extraction_cache = None
+_extraction_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """Return the process-wide response cache, or None when caching is disabled."""
+    global _response_cache
+    if not RESPONSE_CACHE_ENABLED:
+        return None
+    with _response_cache_lock:
+        if _response_cache is None:
+            _response_cache = ResponseCache(os.path.join(CACHE_DIR, "responses.sqlite3"))
+        return _response_cache
+
+
+def get_extraction_cache():
+    """Return the process-wide cache of extracted PDF text, keyed by file content hash."""
+    global _extraction_cache
+    with _extraction_cache_lock:
+        if _extraction_cache is None:
+            _extraction_cache = BlobCache(
+                os.path.join(CACHE_DIR, "extracted"),
+                EXTRACTION_CACHE_MEMORY_BYTES,
+                ttl=EXTRACTION_CACHE_TTL,
+                disk_budget=EXTRACTION_CACHE_MAX_BYTES,
+            )
+        return _extraction_cache
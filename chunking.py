@@ -0,0 +1,91 @@
+import re
+
+# Lines that usually open a new section in an RFP: "Section 4", "Appendix B", "3.2 Scope of Work"
+NUMBERED_HEADING = re.compile(
+    r"^(?:(?:section|part|appendix|annex|schedule|article)\s+[\w.]+|\d+(?:\.\d+)*\.?\s+[A-Z])",
+    re.IGNORECASE,
+)
+
+
+def is_heading(line):
+    """Return True if a line looks like a section heading (numbered clause or short all-caps title)."""
+    stripped = line.strip()
+    if not stripped:
+        return False
+    if NUMBERED_HEADING.match(stripped):
+        return True
+    return stripped.isupper() and 4 <= len(stripped) <= 80
+
+
+def split_sections(text):
+    """Split text into sections, starting a new one at each line that looks like a heading."""
+    sections = []
+    current = []
+    for line in text.splitlines(keepends=True):
+        if is_heading(line) and current:
+            sections.append("".join(current))
+            current = []
+        current.append(line)
+    if current:
+        sections.append("".join(current))
+    return sections
+
+
+def _split_long(section, chunk_size):
+    """Break a section longer than chunk_size on line boundaries, or hard-split a single long line."""
+    pieces = []
+    current = ""
+    for line in section.splitlines(keepends=True):
+        while len(line) > chunk_size:
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.append(line[:chunk_size])
+            line = line[chunk_size:]
+        if current and len(current) + len(line) > chunk_size:
+            pieces.append(current)
+            current = ""
+        current += line
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def _tail(text, overlap):
+    """Return roughly the last overlap characters of text, starting at a line boundary when possible."""
+    if overlap <= 0 or not text:
+        return ""
+    tail = text[-overlap:]
+    newline = tail.find("\n")
+    if 0 <= newline < len(tail) - 1:
+        tail = tail[newline + 1:]
+    return tail
+
+
+def split_into_chunks(text, chunk_size=20000, overlap=1000):
+    """
+    Split a long document into overlapping, section-aware chunks.
+
+    Whole sections are packed into chunks of about chunk_size characters;
+    sections that are too long on their own are split on line boundaries.
+    Each chunk after the first also starts with up to overlap characters from
+    the end of the previous one, so a requirement that straddles a boundary
+    is seen whole at least once.
+    """
+    pieces = []
+    for section in split_sections(text):
+        if len(section) > chunk_size:
+            pieces.extend(_split_long(section, chunk_size))
+        else:
+            pieces.append(section)
+
+    chunks = []
+    current = ""
+    for piece in pieces:
+        if current and len(current) + len(piece) > chunk_size:
+            chunks.append(current)
+            current = _tail(current, overlap)
+        current += piece
+    if current.strip():
+        chunks.append(current)
+    return chunks
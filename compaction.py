@@ -0,0 +1,203 @@
+"""
+Deterministic prompt compaction for extracted PDF text and pasted RFP analyses.
+
+Levels:
+    0  off: the text is passed through exactly as the original prompts used it
+    1  safe: drops headers, footers and page numbers repeated on the edges of
+       pages, rejoins words hyphenated across line breaks, and collapses runs
+       of whitespace and blank lines; in an RFP analysis, list items repeated
+       under the same heading are dropped
+    2  aggressive: additionally drops consecutive duplicate lines (which can
+       be table cells such as "Mandatory" twice in a row), repeats of lines
+       already seen that consist of whole sentences, blank lines and
+       markdown emphasis markers
+
+Every call reports the characters and estimated tokens before and after
+through the metrics registry.
+"""
+import os
+import re
+from collections import Counter
+
+import metrics
+from llm import estimate_tokens
+from pdf_text import PAGE_BREAK
+
+COMPACTION_LEVEL = int(os.environ.get("COMPACTION_LEVEL", "1"))
+
+# Lines within this many non-blank lines of a page edge are header/footer candidates
+EDGE_LINES = 2
+# A candidate is boilerplate if it is on the edge of at least this share of pages (and of 3 pages)
+BOILERPLATE_PAGE_SHARE = 0.5
+# Level 2 only drops repeats of lines at least this long, so short labels like "Yes" survive
+MIN_DEDUPE_LENGTH = 20
+
+PAGE_NUMBER = re.compile(r'^(page\s*)?[-–(]?\s*(\d{1,4})\s*[-–)]?(?:\s*(?:of|/)\s*\d{1,4})?$', re.IGNORECASE)
+HORIZONTAL_SPACE = re.compile(r'[ \t\u00a0\u2000-\u200b]+')
+HYPHEN_BREAK = re.compile(r'([a-z]+)-\n([a-z]+)')
+DIGITS = re.compile(r'\d+')
+EMPHASIS = re.compile(r'\*\*|__')
+SENTENCE_END = ('.', '!', '?')
+
+
+def _edge_key(line):
+    # Page numbers inside headers change from page to page, so compare lines with digits masked
+    return DIGITS.sub('#', line.casefold())
+
+
+def _edge_indexes(lines):
+    """Return the indexes of the first and last EDGE_LINES non-blank lines of a page."""
+    filled = [index for index, line in enumerate(lines) if line]
+    return set(filled[:EDGE_LINES] + filled[-EDGE_LINES:])
+
+
+def _is_page_number(line, page_index):
+    """True for "Page 3", "3 of 10" or "- 3 -"; a bare number must also be close to the page's position."""
+    match = PAGE_NUMBER.match(line)
+    if match is None:
+        return False
+    # Dates and amounts on a page edge are content; cover pages shift numbering by a few
+    return bool(match.group(1)) or abs(int(match.group(2)) - (page_index + 1)) <= 3
+
+
+def _strip_page_furniture(pages, stats):
+    """Remove page numbers and headers/footers repeated across pages, looking only at page edges."""
+    pages = [[HORIZONTAL_SPACE.sub(' ', line).strip() for line in page.split('\n')] for page in pages]
+    edges = [_edge_indexes(lines) for lines in pages]
+
+    counts = Counter()
+    for lines, indexes in zip(pages, edges):
+        counts.update({_edge_key(lines[index]) for index in indexes})
+    threshold = max(3, BOILERPLATE_PAGE_SHARE * len(pages))
+    boilerplate = {key for key, count in counts.items() if count >= threshold}
+
+    cleaned = []
+    for page_index, (lines, indexes) in enumerate(zip(pages, edges)):
+        kept = []
+        for index, line in enumerate(lines):
+            if index in indexes:
+                if _is_page_number(line, page_index):
+                    stats["page_numbers"] += 1
+                    continue
+                if _edge_key(line) in boilerplate:
+                    stats["boilerplate_lines"] += 1
+                    continue
+            kept.append(line)
+        cleaned.append('\n'.join(kept))
+    return '\n'.join(cleaned)
+
+
+def _join_hyphenation(text, stats):
+    """Rejoin words split across lines, keeping the hyphen where the document spells the word with one."""
+    words = Counter(re.findall(r'[a-z]+(?:-[a-z]+)*', text))
+
+    def join(match):
+        head, tail = match.group(1), match.group(2)
+        stats["hyphenation_joins"] += 1
+        if words[f"{head}-{tail}"] > words[head + tail]:
+            return f"{head}-{tail}"
+        return head + tail
+
+    return HYPHEN_BREAK.sub(join, text)
+
+
+def _is_whole_sentences(line, previous):
+    """True if a line starts and ends on a sentence boundary, so dropping a repeat of it cuts no sentence."""
+    return (
+        (not previous or previous.endswith(SENTENCE_END))
+        and line.endswith(SENTENCE_END)
+        and not line[0].islower()
+    )
+
+
+def _dedupe_lines(lines, level, stats):
+    """
+    Collapse runs of blank lines, and at level 2 drop blank lines, consecutive
+    duplicate lines and repeats of long lines made of whole sentences (a
+    wrapped fragment is never dropped).
+    """
+    seen = set()
+    kept = []
+    previous = ''
+    for line in lines:
+        if not line:
+            if level < 2 and previous:
+                kept.append(line)
+            previous = line
+            continue
+        if level >= 2 and (
+            line == previous
+            or (len(line) >= MIN_DEDUPE_LENGTH and line in seen and _is_whole_sentences(line, previous))
+        ):
+            stats["duplicate_lines"] += 1
+            previous = line
+            continue
+        seen.add(line)
+        kept.append(line)
+        previous = line
+    return '\n'.join(kept).strip('\n')
+
+
+def _record(kind, level, before, after, stats):
+    stats.update(
+        level=level,
+        chars_before=len(before),
+        chars_after=len(after),
+        tokens_before=estimate_tokens(before),
+        tokens_after=estimate_tokens(after),
+    )
+    metrics.inc("compaction_tokens_before_total", stats["tokens_before"], kind=kind)
+    metrics.inc("compaction_tokens_after_total", stats["tokens_after"], kind=kind)
+    return stats
+
+
+def compact_document(text, level=None):
+    """
+    Compact text extracted from a PDF for use in a prompt; returns (text, stats).
+
+    Pages are expected to be separated by pdf_text.PAGE_BREAK so headers and
+    footers can be recognized on page edges.
+    """
+    level = COMPACTION_LEVEL if level is None else level
+    with metrics.span("prompt_compaction", kind="document") as span:
+        stats = Counter()
+        if level <= 0:
+            # The exact text the prompts were built from before compaction existed
+            compacted = text.replace(PAGE_BREAK, '')
+        else:
+            compacted = _strip_page_furniture(text.split(PAGE_BREAK), stats)
+            compacted = _join_hyphenation(compacted, stats)
+            compacted = _dedupe_lines(compacted.split('\n'), level, stats)
+        stats = _record("document", level, text, compacted, dict(stats))
+        span.set(**stats)
+    return compacted, stats
+
+
+def compact_requirements(markdown_text, level=None):
+    """Compact an RFP requirements analysis before it is pasted into every condense prompt; returns (text, stats)."""
+    level = COMPACTION_LEVEL if level is None else level
+    with metrics.span("prompt_compaction", kind="requirements") as span:
+        stats = Counter()
+        compacted = markdown_text
+        if level > 0:
+            lines = [HORIZONTAL_SPACE.sub(' ', line).strip() for line in markdown_text.split('\n')]
+            seen_items = set()
+            heading = ''
+            kept = []
+            for line in lines:
+                if line.startswith('#'):
+                    heading = line.lstrip('#').strip().casefold()
+                elif line.startswith(('- ', '* ')):
+                    # Keyed by heading: the same requirement under two roles is two requirements
+                    key = (heading, line[2:].casefold())
+                    if key in seen_items:
+                        stats["duplicate_lines"] += 1
+                        continue
+                    seen_items.add(key)
+                if level >= 2:
+                    line = EMPHASIS.sub('', line)
+                kept.append(line)
+            compacted = _dedupe_lines(kept, level, stats)
+        stats = _record("requirements", level, markdown_text, compacted, dict(stats))
+        span.set(**stats)
+    return compacted, stats
@@ -0,0 +1,122 @@
+"""
+Bulk export: many tailored resumes rendered in a worker pool and streamed into one ZIP.
+
+Each resume is added as <name>.pdf and <name>.txt (the plain text the
+single-resume download gives). PDFs are rendered in a shared process pool
+with a bounded number in flight, and every PDF is written into the ZIP as
+soon as it is its turn, so at most a few PDFs are held in memory whatever
+the size of the bundle. export_zip writes the ZIP to a file under
+EXPORT_DIR, so a finished bundle is held on disk rather than in memory;
+files older than EXPORT_TTL are removed as new bundles are built.
+"""
+import os
+import re
+import tempfile
+import zipfile
+from collections import deque
+from concurrent.futures.process import BrokenProcessPool
+
+import metrics
+from caching import CACHE_DIR, prune_directory
+from markdown_doc import parse as parse_markdown
+from process_pool import SharedProcessPool
+
+EXPORT_WORKERS = int(os.environ.get("EXPORT_WORKERS", str(os.cpu_count() or 1)))
+# Bundles with fewer resumes are rendered inline; starting worker processes would cost more than it saves
+EXPORT_PARALLEL_MIN = int(os.environ.get("EXPORT_PARALLEL_MIN", "8"))
+EXPORT_DIR = os.environ.get("EXPORT_DIR", os.path.join(CACHE_DIR, "exports"))
+# Bundles hold CV data, so they are deleted after a day even if their session never built another
+EXPORT_TTL = float(os.environ.get("EXPORT_TTL", str(24 * 3600)))
+
+UNSAFE_NAME = re.compile(r'[^A-Za-z0-9._-]+')
+
+_pool = SharedProcessPool(EXPORT_WORKERS)
+
+
+def render_pdf(markdown_text):
+    """Render one resume to PDF bytes; runs in a worker process or inline."""
+    from pdf_render import get_renderer
+    return get_renderer().render(markdown_text)
+
+
+def iter_pdfs(markdown_texts, workers=None):
+    """
+    Yield the PDF of each markdown document, in order.
+
+    Documents are rendered in the shared pool with at most two per worker
+    submitted ahead of the one being yielded; workers <= 1 or fewer than
+    EXPORT_PARALLEL_MIN documents render inline.
+    """
+    workers = EXPORT_WORKERS if workers is None else workers
+    if workers <= 1 or len(markdown_texts) < EXPORT_PARALLEL_MIN:
+        for markdown_text in markdown_texts:
+            yield render_pdf(markdown_text)
+        return
+
+    pool = _pool.get()
+    pending = deque()
+    remaining = iter(markdown_texts)
+    try:
+        for markdown_text in remaining:
+            pending.append(pool.submit(render_pdf, markdown_text))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    except BrokenProcessPool:
+        _pool.discard(pool)
+        raise
+    finally:
+        # The consumer stopped early or a render failed, so drop work nobody will read
+        for future in pending:
+            future.cancel()
+
+
+def unique_names(names):
+    """Turn names into distinct file-name stems: unsafe characters replaced, repeats numbered."""
+    seen = {}
+    stems = []
+    for name in names:
+        stem = UNSAFE_NAME.sub("_", os.path.splitext(name)[0]).strip("._") or "resume"
+        count = seen.get(stem.lower(), 0) + 1
+        seen[stem.lower()] = count
+        stems.append(stem if count == 1 else f"{stem}_{count}")
+    return stems
+
+
+def write_zip(entries, fileobj, workers=None):
+    """
+    Write [(name, markdown)] into fileobj as a ZIP of <name>.pdf and <name>.txt per resume.
+
+    Returns the number of resumes written.
+    """
+    names = unique_names([name for name, _ in entries])
+    markdown_texts = [markdown_text for _, markdown_text in entries]
+    with metrics.span("bulk_export") as span, zipfile.ZipFile(fileobj, "w", zipfile.ZIP_DEFLATED) as bundle:
+        for stem, markdown_text, pdf_bytes in zip(names, markdown_texts, iter_pdfs(markdown_texts, workers)):
+            bundle.writestr(f"{stem}.pdf", pdf_bytes)
+            bundle.writestr(f"{stem}.txt", parse_markdown(markdown_text).to_plain_text())
+        span.set(resumes=len(names))
+    return len(names)
+
+
+def export_zip(entries, workers=None):
+    """Write the ZIP of entries to a new file under EXPORT_DIR and return its path."""
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    prune_directory(EXPORT_DIR, ttl=EXPORT_TTL)
+    fd, path = tempfile.mkstemp(dir=EXPORT_DIR, suffix=".zip")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write_zip(entries, f, workers=workers)
+    except Exception:
+        os.unlink(path)
+        raise
+    return path
+
+
+def discard_export(path):
+    """Delete a ZIP written by export_zip, if it is still there."""
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
@@ -0,0 +1,180 @@
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+from caching import CACHE_DIR, BlobCache
+
+# Jobs processed at the same time by this server process; the rest wait in the queue
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "4"))
+# Finished jobs kept in memory; older ones are read back from disk when asked for
+JOB_MEMORY_LIMIT = int(os.environ.get("JOB_MEMORY_LIMIT", "256"))
+JOB_STORE_MEMORY_BYTES = int(os.environ.get("JOB_STORE_MEMORY_BYTES", str(16 * 1024 * 1024)))
+# Finished jobs hold the full results, CV text included, so they are kept on disk for a day at most
+JOB_STORE_TTL = float(os.environ.get("JOB_STORE_TTL", str(24 * 3600)))
+JOB_STORE_MAX_BYTES = int(os.environ.get("JOB_STORE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class Job:
+    """
+    One unit of background work with an ID, a status and, once finished, a result or an error.
+
+    partial holds the text streamed so far while the job runs, and spans
+    the metrics spans recorded by the job.
+    """
+
+    def __init__(self, kind, job_id=None):
+        self.id = job_id or uuid.uuid4().hex
+        self.kind = kind
+        self.status = QUEUED
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.result = None
+        self.error = None
+        self.partial = None
+        self.spans = []
+
+    @property
+    def done(self):
+        return self.status in (DONE, FAILED)
+
+    def set_partial(self, text):
+        """on_chunk callback: remember the text streamed so far."""
+        self.partial = text
+
+    def elapsed(self):
+        """Seconds since the job started running (or until it finished), 0 while queued."""
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.time()) - self.started
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+            "result": self.result,
+            "error": self.error,
+            "spans": self.spans,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        job = cls(data["kind"], job_id=data["id"])
+        for name in ("status", "created", "started", "finished", "result", "error", "spans"):
+            setattr(job, name, data[name])
+        return job
+
+
+class JobQueue:
+    """
+    Worker pool for processing jobs that outlives Streamlit reruns.
+
+    Jobs are submitted with a function called as func(job, *args, **kwargs)
+    on a worker thread; its return value must be JSON-serializable and becomes
+    job.result. Finished jobs are persisted, so a session can poll a job by ID
+    even after it has been dropped from memory.
+    """
+
+    def __init__(self, max_workers=JOB_WORKERS, store=None):
+        self.max_workers = max_workers
+        self.store = store
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, kind, func, *args, **kwargs):
+        """Queue func to run as a new job and return the Job."""
+        job = Job(kind)
+        with self._lock:
+            self._jobs[job.id] = job
+        metrics.inc("jobs_submitted_total", kind=kind)
+        self._executor.submit(self._run, job, func, args, kwargs)
+        return job
+
+    def _run(self, job, func, args, kwargs):
+        job.started = time.time()
+        job.status = RUNNING
+        metrics.observe("job_queue_wait_seconds", job.started - job.created, kind=job.kind)
+        with metrics.collect() as spans:
+            try:
+                with metrics.span("job", kind=job.kind):
+                    job.result = func(job, *args, **kwargs)
+                job.status = DONE
+            except Exception as e:
+                job.error = str(e) or type(e).__name__
+                job.status = FAILED
+        job.spans = spans
+        job.partial = None
+        job.finished = time.time()
+        self._persist(job)
+        self._trim()
+
+    def _persist(self, job):
+        if self.store is None:
+            return
+        try:
+            self.store.put(job.id, json.dumps(job.to_dict(), default=str).encode("utf-8"))
+        except OSError:
+            # The job stays available from memory; only a later lookup after eviction is affected
+            pass
+
+    def _trim(self):
+        with self._lock:
+            finished = [job_id for job_id, job in self._jobs.items() if job.done]
+            for job_id in finished[:max(0, len(finished) - JOB_MEMORY_LIMIT)]:
+                del self._jobs[job_id]
+
+    def get(self, job_id):
+        """Return the job with this ID, from memory or the persisted store, or None."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None or self.store is None:
+            return job
+        data = self.store.get(job_id)
+        return Job.from_dict(json.loads(data)) if data is not None else None
+
+    def position(self, job):
+        """Return how many queued jobs were submitted before this one."""
+        with self._lock:
+            return sum(1 for other in self._jobs.values() if other.status == QUEUED and other.created < job.created)
+
+    def stats(self):
+        """Return the number of in-memory jobs per status."""
+        with self._lock:
+            counts = {QUEUED: 0, RUNNING: 0, DONE: 0, FAILED: 0}
+            for job in self._jobs.values():
+                counts[job.status] += 1
+            return counts
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue():
+    """Return the process-wide job queue shared by all sessions."""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            store = BlobCache(
+                os.path.join(CACHE_DIR, "jobs"),
+                JOB_STORE_MEMORY_BYTES,
+                ttl=JOB_STORE_TTL,
+                disk_budget=JOB_STORE_MAX_BYTES,
+            )
+            _queue = JobQueue(store=store)
+        return _queue
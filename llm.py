@@ -0,0 +1,206 @@
+import os
+import random
+import threading
+import time
+
+from backends import get_backend
+from caching import get_response_cache
+from metrics import TOKEN_BUCKETS, get_registry
+
+MODEL_NAME = "gemini-2.0-flash"
+
+# Process-wide limits shared by every session and batch worker; 0 disables a limit
+LLM_REQUESTS_PER_MINUTE = float(os.environ.get("LLM_REQUESTS_PER_MINUTE", "60"))
+LLM_TOKENS_PER_MINUTE = float(os.environ.get("LLM_TOKENS_PER_MINUTE", "1000000"))
+LLM_MAX_CONCURRENCY = int(os.environ.get("LLM_MAX_CONCURRENCY", "8"))
+LLM_MAX_RETRIES = int(os.environ.get("LLM_MAX_RETRIES", "4"))
+LLM_BACKOFF_BASE = float(os.environ.get("LLM_BACKOFF_BASE", "1.0"))
+LLM_BACKOFF_MAX = float(os.environ.get("LLM_BACKOFF_MAX", "30.0"))
+
+
+def estimate_tokens(text):
+    """Rough token count for rate limiting; Gemini averages about four characters per token."""
+    return max(1, len(text) // 4)
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled continuously at rate_per_minute.
+
+    The bucket holds up to one minute's worth of tokens, so short bursts are
+    allowed while the average rate stays under the limit. A rate of 0 means
+    unlimited.
+    """
+
+    def __init__(self, rate_per_minute):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = rate_per_minute
+        self.tokens = rate_per_minute
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, amount=1):
+        """Block until amount tokens are available, take them, and return the seconds waited."""
+        if not self.rate:
+            return 0.0
+        # A single request larger than the bucket would otherwise wait forever
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return waited
+                delay = (amount - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+_request_bucket = TokenBucket(LLM_REQUESTS_PER_MINUTE)
+_token_bucket = TokenBucket(LLM_TOKENS_PER_MINUTE)
+_concurrency = threading.BoundedSemaphore(LLM_MAX_CONCURRENCY)
+
+# Keys of metrics() and the registry series they are read from; the waits are histograms, reported by their sums
+METRIC_SERIES = {
+    "calls": "llm_requests_total",
+    "retries": "llm_retries_total",
+    "failures": "llm_failures_total",
+    "rate_limit_wait_seconds": "llm_rate_limit_wait_seconds",
+    "concurrency_wait_seconds": "llm_concurrency_wait_seconds",
+    "backoff_seconds": "llm_backoff_seconds",
+}
+
+
+def configure_limits(requests_per_minute=None, tokens_per_minute=None, max_concurrency=None):
+    """Replace the process-wide limits, e.g. from batch command-line options."""
+    global _request_bucket, _token_bucket, _concurrency
+    if requests_per_minute is not None:
+        _request_bucket = TokenBucket(requests_per_minute)
+    if tokens_per_minute is not None:
+        _token_bucket = TokenBucket(tokens_per_minute)
+    if max_concurrency is not None:
+        _concurrency = threading.BoundedSemaphore(max_concurrency)
+
+
+def metrics():
+    """Return the call, retry and wait-time totals of this process, as recorded in the metrics registry."""
+    registry = get_registry()
+    return {key: registry.total(series) for key, series in METRIC_SERIES.items()}
+
+
+def _backoff_delay(attempt):
+    """Full-jitter exponential backoff for the given retry attempt (0-based)."""
+    return random.uniform(0, min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * (2 ** attempt)))
+
+
+def _call_backend(backend, prompt, model_name, on_chunk):
+    """Make one model request, streaming into on_chunk if given, and return the full text."""
+    if on_chunk is None:
+        return backend.generate(prompt, model_name)
+
+    parts = []
+    stream = backend.stream(prompt, model_name)
+    try:
+        for chunk in stream:
+            parts.append(chunk)
+            on_chunk("".join(parts))
+    except backend.retryable_errors as e:
+        # Tell the retry loop whether the caller has already seen partial output
+        e.chunks_delivered = len(parts)
+        raise
+    finally:
+        # Stops the underlying request if the caller aborted mid-stream
+        stream.close()
+    return "".join(parts)
+
+
+def generate_text(prompt, model_name=MODEL_NAME, on_chunk=None):
+    """
+    Return the model's response text for a prompt, served from the response cache when possible.
+
+    Calls go through the configured backend and the process-wide request,
+    token and concurrency limits, and retryable errors are retried with
+    jittered exponential backoff. When on_chunk is given the response is
+    streamed and on_chunk(partial_text) is called with the text received so
+    far after every chunk; a stream that fails after output was shown is not
+    retried. If the caller aborts mid-stream (for example a Streamlit rerun
+    raised from on_chunk), the stream is cancelled and nothing is cached.
+    """
+    backend = get_backend()
+    with get_registry().span("llm_call", backend=backend.name) as span:
+        span.set(model=model_name)
+        text, cached = _generate(backend, prompt, model_name, on_chunk, span)
+        _record_usage(span, backend, prompt, text, cached)
+    return text
+
+
+def _generate(backend, prompt, model_name, on_chunk, span):
+    """Serve a prompt from the cache or the backend; returns (text, served_from_cache)."""
+    cache_name = backend.cache_name(model_name)
+    cache = get_response_cache()
+    if cache is not None:
+        cached = cache.get(cache_name, prompt)
+        if cached is not None:
+            if on_chunk is not None:
+                on_chunk(cached)
+            return cached, True
+
+    registry = get_registry()
+    attempt = 0
+    while True:
+        span.set(attempts=attempt + 1)
+        waited = _request_bucket.acquire()
+        waited += _token_bucket.acquire(estimate_tokens(prompt))
+        registry.observe("llm_rate_limit_wait_seconds", waited, backend=backend.name)
+
+        started = time.monotonic()
+        with _concurrency:
+            registry.observe("llm_concurrency_wait_seconds", time.monotonic() - started, backend=backend.name)
+            registry.inc("llm_requests_total", backend=backend.name)
+            try:
+                text = _call_backend(backend, prompt, model_name, on_chunk)
+                break
+            except backend.retryable_errors as e:
+                if attempt >= LLM_MAX_RETRIES or getattr(e, "chunks_delivered", 0):
+                    registry.inc("llm_failures_total", backend=backend.name, error=type(e).__name__)
+                    raise
+            except Exception as e:
+                registry.inc("llm_failures_total", backend=backend.name, error=type(e).__name__)
+                raise
+        # Back off outside the concurrency slot so other calls can use it
+        delay = _backoff_delay(attempt)
+        registry.inc("llm_retries_total", backend=backend.name)
+        registry.observe("llm_backoff_seconds", delay, backend=backend.name)
+        time.sleep(delay)
+        attempt += 1
+
+    if cache is not None:
+        cache.put(cache_name, prompt, text)
+    return text, False
+
+
+def _record_usage(span, backend, prompt, text, cached):
+    """Attach prompt and response sizes to the call's span and add uncached usage to the quota counters."""
+    prompt_tokens = estimate_tokens(prompt)
+    response_tokens = estimate_tokens(text)
+    span.label(cache="hit" if cached else "miss")
+    span.set(
+        prompt_chars=len(prompt),
+        response_chars=len(text),
+        prompt_tokens=prompt_tokens,
+        response_tokens=response_tokens,
+    )
+    registry = get_registry()
+    if cached:
+        registry.inc("llm_cache_hits_total", backend=backend.name)
+        return
+    # Token counts are estimates (see estimate_tokens); only calls that reached the backend use quota
+    registry.inc("llm_prompt_chars_total", len(prompt), backend=backend.name)
+    registry.inc("llm_response_chars_total", len(text), backend=backend.name)
+    registry.inc("llm_prompt_tokens_total", prompt_tokens, backend=backend.name)
+    registry.inc("llm_response_tokens_total", response_tokens, backend=backend.name)
+    registry.observe("llm_prompt_tokens", prompt_tokens, buckets=TOKEN_BUCKETS, backend=backend.name)
+    registry.observe("llm_response_tokens", response_tokens, buckets=TOKEN_BUCKETS, backend=backend.name)
@@ -0,0 +1,277 @@
+"""
+Single-pass markdown tokenizer shared by clean_markdown, clean_text_for_download and the PDF renderer.
+
+A document is split into lines once; each line is classified once and its
+normalized, plain-text and ReportLab forms are derived from that token and
+cached. The output is byte-for-byte what the original chains of re.sub calls
+produce. The few constructs whose regex handling spans several lines (a
+heading or list marker with nothing after it, a link split across lines) make
+the document fall back to those original regexes.
+"""
+import re
+import threading
+from collections import OrderedDict
+
+# Parsed documents remembered per process, so reruns re-render without re-tokenizing
+PARSE_CACHE_SIZE = 128
+
+BOLD = re.compile(r'\*\*(.*?)\*\*')
+ITALIC = re.compile(r'\*(.*?)\*')
+CODE = re.compile(r'`(.*?)`')
+LINK = re.compile(r'\[([^\]]+)\]\([^\)]+\)')
+PLAIN_TEXT_DELETIONS = str.maketrans('', '', '*`')
+MARKDOWN_FENCE = '```markdown'
+
+
+def legacy_clean_markdown(markdown_text):
+    """Clean and standardize markdown formatting with the original regex passes."""
+    # Ensure consistent header formatting
+    markdown_text = re.sub(r'^#(?!#)\s*', '# ', markdown_text, flags=re.MULTILINE)
+    markdown_text = re.sub(r'^##(?!#)\s*', '## ', markdown_text, flags=re.MULTILINE)
+    markdown_text = re.sub(r'^###(?!#)\s*', '### ', markdown_text, flags=re.MULTILINE)
+
+    # Ensure consistent list formatting
+    markdown_text = re.sub(r'^\s*[-*]\s*', '- ', markdown_text, flags=re.MULTILINE)
+
+    # Add proper spacing between sections
+    markdown_text = re.sub(r'\n{3,}', '\n\n', markdown_text)
+
+    # Remove ```markdown at the start if present
+    markdown_text = re.sub(r'^```markdown\s*', '', markdown_text)
+
+    return markdown_text
+
+
+def legacy_clean_text_for_download(markdown_text):
+    """Remove markdown formatting characters with the original regex passes."""
+    if not markdown_text:
+        return ""
+
+    # Remove markdown headings (# symbols)
+    text = re.sub(r'^#+\s+', '', markdown_text, flags=re.MULTILINE)
+
+    # Remove bold and italic formatting (* symbols)
+    text = re.sub(r'\*\*', '', text)  # Remove bold (**)
+    text = re.sub(r'\*', '', text)    # Remove italic (*)
+
+    # Remove other common markdown elements
+    text = re.sub(r'`', '', text)     # Remove code ticks
+    text = re.sub(r'\[([^\]]+)\]\([^\)]+\)', r'\1', text)  # Replace links with just the text
+
+    return text
+
+
+def inline_to_pdf_markup(text):
+    """Replace markdown bold/italic/code markers with ReportLab paragraph markup."""
+    if '*' in text:
+        text = BOLD.sub(r'<b>\1</b>', text)
+        text = ITALIC.sub(r'<i>\1</i>', text)
+    if '`' in text:
+        # Replace backticks with appropriate formatting
+        text = CODE.sub(r'<font face="Courier">\1</font>', text)
+    return text
+
+
+def _heading_level(raw):
+    """Return the number of leading '#' characters of a line."""
+    level = 0
+    while level < len(raw) and raw[level] == '#':
+        level += 1
+    return level
+
+
+def _link_is_single_line(text):
+    """Return True if every link the link regex could match in text ends on this line."""
+    position = 0
+    while True:
+        start = text.find('[', position)
+        if start < 0:
+            return True
+        close = text.find(']', start + 1)
+        if close < 0:
+            return False
+        if text.startswith('(', close + 1) and text.find(')', close + 2) < 0:
+            return False
+        position = start + 1
+
+
+class Line:
+    """One source line with its token kind and lazily derived renderings."""
+
+    __slots__ = ('raw', '_stripped')
+
+    def __init__(self, raw):
+        self.raw = raw
+        self._stripped = None
+
+    @property
+    def stripped(self):
+        if self._stripped is None:
+            self._stripped = self.raw.strip()
+        return self._stripped
+
+    @property
+    def is_blank(self):
+        return not self.raw or self.raw.isspace()
+
+    def pdf_block(self):
+        """Return (kind, markup) as the PDF renderer sees this line; kind is title/section/subsection/item/text/blank."""
+        line = self.stripped
+        if not line:
+            return 'blank', ''
+        if line.startswith('# '):
+            return 'title', inline_to_pdf_markup(line[2:])
+        if line.startswith('## '):
+            return 'section', inline_to_pdf_markup(line[3:])
+        if line.startswith('### '):
+            return 'subsection', inline_to_pdf_markup(line[4:])
+        if line.startswith('- '):
+            return 'item', inline_to_pdf_markup(line[2:])
+        return 'text', inline_to_pdf_markup(line)
+
+
+class Document:
+    """A markdown text tokenized into lines, with cached normalized, plain-text and PDF renderings."""
+
+    def __init__(self, text):
+        self.text = text
+        self.lines = [Line(raw) for raw in text.split('\n')]
+        self._normalized = None
+        self._plain_text = None
+        self._pdf_blocks = None
+        self._lock = threading.Lock()
+
+    def normalized(self):
+        """Return the document as clean_markdown formats it."""
+        with self._lock:
+            if self._normalized is None:
+                text = self._normalize()
+                if text is None:
+                    # Multi-line constructs: defer to the original regex passes
+                    text = legacy_clean_markdown(self.text)
+                self._normalized = self if text == self.text else parse(text)
+            return self._normalized
+
+    def _normalize(self):
+        out = []
+        pending_blank = []
+        for line in self.lines:
+            raw = line.raw
+            if line.is_blank:
+                pending_blank.append(raw)
+                continue
+
+            if raw[0] == '#':
+                level = _heading_level(raw)
+                if level <= 3:
+                    content = raw[level:].lstrip()
+                    if not content:
+                        return None
+                    raw = '#' * level + ' ' + content
+            else:
+                content = raw.lstrip()
+                if content[0] in '-*':
+                    content = content[1:].lstrip()
+                    if not content:
+                        return None
+                    raw = '- ' + content
+                    # Blank lines directly before a list item are absorbed into it
+                    pending_blank = []
+            out.extend(pending_blank)
+            pending_blank = []
+            out.append(raw)
+        out.extend(pending_blank)
+
+        text = '\n'.join(self._collapse_empty_runs(out))
+        if text.startswith(MARKDOWN_FENCE):
+            text = text[len(MARKDOWN_FENCE):].lstrip()
+        return text
+
+    @staticmethod
+    def _collapse_empty_runs(lines):
+        """Turn every run of three or more newlines into exactly two."""
+        out = []
+        count = len(lines)
+        index = 0
+        while index < count:
+            if lines[index]:
+                out.append(lines[index])
+                index += 1
+                continue
+            end = index
+            while end < count and not lines[end]:
+                end += 1
+            run = end - index
+            # Newlines in the run: one per empty line, plus one more when it sits between two lines
+            newlines = run + 1 if 0 < index and end < count else run
+            if index == 0 and end == count:
+                newlines = run - 1
+            if newlines >= 3:
+                run = 1 if 0 < index and end < count else 2
+                if index == 0 and end == count:
+                    run = 3
+            out.extend([''] * run)
+            index = end
+        return out
+
+    def to_markdown(self):
+        return self.text
+
+    def pdf_blocks(self):
+        """Return the (kind, markup) pair of every line as the PDF renderer consumes them."""
+        with self._lock:
+            if self._pdf_blocks is None:
+                self._pdf_blocks = [line.pdf_block() for line in self.lines]
+            return self._pdf_blocks
+
+    def to_plain_text(self):
+        """Return the document as clean_text_for_download formats it."""
+        with self._lock:
+            if self._plain_text is None:
+                text = self._plain()
+                self._plain_text = legacy_clean_text_for_download(self.text) if text is None else text
+            return self._plain_text
+
+    def _plain(self):
+        if not self.text:
+            return ""
+        out = []
+        last = len(self.lines) - 1
+        for index, line in enumerate(self.lines):
+            raw = line.raw
+            if raw.startswith('#'):
+                level = _heading_level(raw)
+                if level == len(raw) and index < last:
+                    # A bare run of hashes: the heading regex would consume the newline
+                    return None
+                if level < len(raw) and raw[level].isspace():
+                    raw = raw[level:].lstrip()
+                    if not raw:
+                        return None
+            raw = raw.translate(PLAIN_TEXT_DELETIONS)
+            if '[' in raw:
+                if not _link_is_single_line(raw):
+                    return None
+                raw = LINK.sub(r'\1', raw)
+            out.append(raw)
+        return '\n'.join(out)
+
+
+_parse_cache = OrderedDict()
+_parse_lock = threading.Lock()
+
+
+def parse(text):
+    """Return the tokenized Document for a markdown text, reusing it if the same text was parsed recently."""
+    with _parse_lock:
+        document = _parse_cache.get(text)
+        if document is not None:
+            _parse_cache.move_to_end(text)
+            return document
+
+    document = Document(text)
+    with _parse_lock:
+        _parse_cache[text] = document
+        while len(_parse_cache) > PARSE_CACHE_SIZE:
+            _parse_cache.popitem(last=False)
+    return document
@@ -0,0 +1,235 @@
+"""
+Local requirement matching: rank extracted resumes against an RFP analysis without any LLM call.
+
+The analyze_rfp output is turned into a weighted set of requirement terms
+(words and two-word phrases, weighted by the section they appear in and by
+emphasis). Resumes are held in a TF-IDF index stored term by term, so a
+query only touches the postings of its own terms and ranking thousands of
+resumes is a handful of numpy operations. The index is saved as one
+compressed .npz file and reused while the resume set is unchanged.
+"""
+import os
+import re
+from collections import Counter
+
+import numpy as np
+
+from caching import atomic_write
+
+TOKEN = re.compile(r"[a-z0-9][a-z0-9+#]*(?:[./-][a-z0-9+#]+)*")
+HEADING = re.compile(r"^#+\s*")
+EMPHASIZED = re.compile(r"\*\*(.+?)\*\*")
+
+# Words that carry no signal about fit in resumes or requirement lists
+STOPWORDS = frozenset("""
+a about above after all also an and any are as at be been being between both but by can could did do does
+during each etc for from had has have having he her his how i if in into is it its may me more most must my
+no not of on one or other our out over own per shall she should so some such than that the their them then
+there these they this those through to under up upon very was we were what when where which while who will
+with within would you your
+ability able candidate candidates consultant consultants demonstrated excellent experience experienced
+good including knowledge minimum must-have preferred proficiency proficient proven relevant required
+requirement requirements role responsibilities responsible skill skills strong understanding work working
+year years
+""".split())
+
+# Requirement section weights, matched against lowercased heading text
+SECTION_WEIGHTS = (
+    ("certif", 2.0),
+    ("technical", 2.0),
+    ("required", 2.0),
+    ("mandatory", 2.0),
+    ("qualification", 1.5),
+    ("expertise", 1.5),
+    ("domain", 1.5),
+    ("preferred", 0.5),
+    ("nice to have", 0.5),
+    ("desirable", 0.5),
+)
+EMPHASIS_WEIGHT = 1.5
+
+
+def tokenize(text):
+    """Return the index terms of a text: words minus stopwords, plus two-word phrases."""
+    words = [word for word in TOKEN.findall(text.lower()) if word not in STOPWORDS and not word.isdigit()]
+    return words + [f"{first} {second}" for first, second in zip(words, words[1:])]
+
+
+def _section_weight(heading):
+    heading = heading.lower()
+    for marker, weight in SECTION_WEIGHTS:
+        if marker in heading:
+            return weight
+    return 1.0
+
+
+def requirement_weights(rfp_requirements):
+    """
+    Turn an analyze_rfp markdown output into {term: weight}.
+
+    Terms under required/technical/certification headings count double,
+    preferred ones half, and bold terms get an extra boost. A term's
+    weight grows with the square root of how often it is mentioned.
+    """
+    weights = Counter()
+    section = 1.0
+    for line in rfp_requirements.split("\n"):
+        stripped = line.strip()
+        if not stripped:
+            continue
+        if stripped.startswith("#"):
+            section = _section_weight(stripped)
+            # Headings name sections, not requirements, so they add no terms
+            continue
+        stripped = HEADING.sub("", stripped)
+        for term in tokenize(stripped):
+            weights[term] += section
+        for emphasized in EMPHASIZED.findall(stripped):
+            for term in tokenize(emphasized):
+                weights[term] += section * (EMPHASIS_WEIGHT - 1)
+    return {term: float(np.sqrt(weight)) for term, weight in weights.items()}
+
+
+class ResumeIndex:
+    """
+    TF-IDF index over resume texts, stored as per-term postings.
+
+    ids and hashes identify the indexed resumes (hashes let callers tell
+    whether a saved index is still current). postings for term t are
+    doc_indices[offsets[t]:offsets[t + 1]] with matching weights; document
+    vectors use sublinear term frequency and are L2-normalized.
+    """
+
+    def __init__(self, ids, hashes, vocabulary, idf, offsets, doc_indices, weights):
+        self.ids = list(ids)
+        self.hashes = list(hashes)
+        self.vocabulary = vocabulary
+        self.idf = idf
+        self.offsets = offsets
+        self.doc_indices = doc_indices
+        self.weights = weights
+
+    @classmethod
+    def build(cls, documents):
+        """Build an index from (id, content hash, text) triples."""
+        ids, hashes, term_counts = [], [], []
+        document_frequency = Counter()
+        for doc_id, digest, text in documents:
+            counts = Counter(tokenize(text))
+            ids.append(doc_id)
+            hashes.append(digest)
+            term_counts.append(counts)
+            document_frequency.update(counts.keys())
+
+        terms = sorted(document_frequency)
+        vocabulary = {term: column for column, term in enumerate(terms)}
+        count = len(ids)
+        idf = np.array(
+            [np.log((1 + count) / (1 + document_frequency[term])) + 1 for term in terms], dtype=np.float32
+        )
+
+        # Gather (term, document, weight) triples, then sort them term-major into postings
+        columns, rows, values = [], [], []
+        for row, counts in enumerate(term_counts):
+            if not counts:
+                continue
+            doc_columns = np.fromiter((vocabulary[term] for term in counts), dtype=np.int32, count=len(counts))
+            tf = 1 + np.log(np.fromiter(counts.values(), dtype=np.float32, count=len(counts)))
+            vector = tf * idf[doc_columns]
+            vector /= np.linalg.norm(vector)
+            columns.append(doc_columns)
+            rows.append(np.full(len(counts), row, dtype=np.int32))
+            values.append(vector.astype(np.float32))
+
+        if columns:
+            columns, rows, values = np.concatenate(columns), np.concatenate(rows), np.concatenate(values)
+        else:
+            columns = rows = np.zeros(0, dtype=np.int32)
+            values = np.zeros(0, dtype=np.float32)
+        order = np.argsort(columns, kind="stable")
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(columns, minlength=len(terms)), out=offsets[1:])
+        return cls(ids, hashes, vocabulary, idf, offsets, rows[order], values[order])
+
+    def __len__(self):
+        return len(self.ids)
+
+    def scores(self, weights):
+        """Return the cosine similarity of every indexed resume to a {term: weight} requirement set."""
+        columns = [self.vocabulary[term] for term in weights if term in self.vocabulary]
+        if not columns or not self.ids:
+            return np.zeros(len(self.ids), dtype=np.float32)
+        columns = np.array(columns, dtype=np.int64)
+        query = np.array([weights[term] for term in weights if term in self.vocabulary], dtype=np.float32)
+        query *= self.idf[columns]
+        query /= np.linalg.norm(query)
+
+        starts, stops = self.offsets[columns], self.offsets[columns + 1]
+        lengths = stops - starts
+        # Flatten all query postings into one index array and accumulate per document in one pass
+        positions = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        contributions = self.weights[positions] * np.repeat(query, lengths)
+        return np.bincount(self.doc_indices[positions], weights=contributions, minlength=len(self.ids))
+
+    def rank(self, weights, top=None):
+        """Return [(id, score)] best first, limited to the top entries if given."""
+        scores = self.scores(weights)
+        order = np.argsort(-scores, kind="stable")
+        if top is not None:
+            order = order[:top]
+        return [(self.ids[index], float(scores[index])) for index in order]
+
+    def save(self, path):
+        """Write the index to a compressed .npz file, replacing it atomically."""
+        with atomic_write(path) as f:
+            np.savez_compressed(
+                f,
+                ids=np.array(self.ids, dtype=str),
+                hashes=np.array(self.hashes, dtype=str),
+                terms=np.array(sorted(self.vocabulary, key=self.vocabulary.get), dtype=str),
+                idf=self.idf,
+                offsets=self.offsets,
+                doc_indices=self.doc_indices,
+                weights=self.weights.astype(np.float16),
+            )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            terms = data["terms"].tolist()
+            return cls(
+                data["ids"].tolist(),
+                data["hashes"].tolist(),
+                {term: column for column, term in enumerate(terms)},
+                data["idf"],
+                data["offsets"],
+                data["doc_indices"],
+                data["weights"].astype(np.float32),
+            )
+
+
+def load_or_build(path, documents):
+    """
+    Return the index saved at path if it covers exactly these documents, else build and save a new one.
+
+    documents is a list of (id, content hash, text) triples.
+    """
+    wanted = sorted((doc_id, digest) for doc_id, digest, _ in documents)
+    if path and os.path.exists(path):
+        try:
+            index = ResumeIndex.load(path)
+            if sorted(zip(index.ids, index.hashes)) == wanted:
+                return index
+        except (OSError, ValueError, KeyError):
+            # A truncated or outdated file is rebuilt below
+            pass
+    index = ResumeIndex.build(documents)
+    if path:
+        index.save(path)
+    return index
+
+
+def matched_terms(weights, text, limit=10):
+    """Return the highest-weighted requirement terms that appear in a resume, for explaining a ranking."""
+    present = set(tokenize(text))
+    return [term for term in sorted(weights, key=lambda term: (-weights[term], term)) if term in present][:limit]
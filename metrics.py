@@ -0,0 +1,214 @@
+import contextvars
+import json
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds (seconds) of the duration histogram buckets, from a cached lookup to a long Gemini call
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+# Upper bounds of the token-count histogram buckets, sized for resumes and RFP prompts
+TOKEN_BUCKETS = (100, 250, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000, 250000)
+
+# Spans finished in the current context are also appended here while collect() is active
+_collector = contextvars.ContextVar("metrics_collector", default=None)
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus layout."""
+
+    def __init__(self, buckets=SECONDS_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+
+
+class Span:
+    """One timed operation: its name, labels, free-form attributes and duration."""
+
+    __slots__ = ("name", "labels", "attributes", "seconds")
+
+    def __init__(self, name, labels):
+        self.name = name
+        self.labels = labels
+        self.attributes = {}
+        self.seconds = None
+
+    def set(self, **attributes):
+        """Attach attributes such as sizes or token counts to the span."""
+        self.attributes.update(attributes)
+
+    def label(self, **labels):
+        """Add labels known only once the operation is under way, e.g. whether it hit a cache."""
+        self.labels.update(labels)
+
+    def as_dict(self):
+        return {"name": self.name, "seconds": self.seconds, **self.labels, **self.attributes}
+
+
+def _label_key(labels):
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (
+        '{}="{}"'.format(name, value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in pairs
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+def _format_number(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Registry:
+    """
+    Process-wide store of counters and histograms, keyed by name and labels.
+
+    span() times a block of code into a "<name>_seconds" histogram; observe()
+    and inc() record arbitrary values. Everything can be exported as
+    Prometheus text or as JSON lines.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+
+    def inc(self, name, amount=1, **labels):
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            key = _label_key(labels)
+            series[key] = series.get(key, 0) + amount
+
+    def observe(self, name, value, buckets=SECONDS_BUCKETS, **labels):
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            key = _label_key(labels)
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    @contextmanager
+    def span(self, name, **labels):
+        """Time the block into the "<name>_seconds" histogram, labelled with status ok or error."""
+        span = Span(name, labels)
+        status = "error"
+        started = time.perf_counter()
+        try:
+            yield span
+            status = "ok"
+        finally:
+            span.seconds = time.perf_counter() - started
+            self.observe(name + "_seconds", span.seconds, status=status, **span.labels)
+            collector = _collector.get()
+            if collector is not None:
+                collector.append(span.as_dict())
+
+    def total(self, name):
+        """Return a counter's value, or a histogram's sum, added up over all its label sets; 0 if never recorded."""
+        with self._lock:
+            if name in self._counters:
+                return sum(self._counters[name].values())
+            return sum(histogram.sum for histogram in self._histograms.get(name, {}).values())
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def to_prometheus(self):
+        """Return all series in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            for name in sorted(self._counters):
+                lines.append(f"# TYPE {name} counter")
+                for key, value in sorted(self._counters[name].items()):
+                    lines.append(f"{name}{_format_labels(key)} {_format_number(value)}")
+            for name in sorted(self._histograms):
+                lines.append(f"# TYPE {name} histogram")
+                for key, histogram in sorted(self._histograms[name].items()):
+                    for bound, count in zip(histogram.buckets + (math.inf,), histogram.counts + [histogram.count]):
+                        lines.append(f"{name}_bucket{_format_labels(key, [('le', _format_number(bound))])} {count}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {_format_number(histogram.sum)}")
+                    lines.append(f"{name}_count{_format_labels(key)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def to_json_lines(self):
+        """Return one JSON object per series, one per line."""
+        records = []
+        with self._lock:
+            for name in sorted(self._counters):
+                for key, value in sorted(self._counters[name].items()):
+                    records.append({"name": name, "type": "counter", "labels": dict(key), "value": value})
+            for name in sorted(self._histograms):
+                for key, histogram in sorted(self._histograms[name].items()):
+                    records.append({
+                        "name": name,
+                        "type": "histogram",
+                        "labels": dict(key),
+                        "count": histogram.count,
+                        "sum": histogram.sum,
+                        "buckets": {str(bound): count for bound, count in zip(histogram.buckets, histogram.counts)},
+                    })
+        return "".join(json.dumps(record, sort_keys=True) + "\n" for record in records)
+
+
+_registry = Registry()
+
+
+def get_registry():
+    """Return the process-wide metrics registry."""
+    return _registry
+
+
+def span(name, **labels):
+    """Time a block of code in the process-wide registry; see Registry.span."""
+    return _registry.span(name, **labels)
+
+
+def observe(name, value, buckets=SECONDS_BUCKETS, **labels):
+    _registry.observe(name, value, buckets=buckets, **labels)
+
+
+def inc(name, amount=1, **labels):
+    _registry.inc(name, amount, **labels)
+
+
+@contextmanager
+def collect():
+    """
+    Collect the spans finished inside the block into the yielded list, as dicts.
+
+    Spans from worker threads are included when the work is submitted with a
+    copy of the caller's context (as Pipeline does).
+    """
+    spans = []
+    token = _collector.set(spans)
+    try:
+        yield spans
+    finally:
+        _collector.reset(token)
+
+
+def write_export(path, registry=None):
+    """Write the registry to path: JSON lines if it ends in .jsonl, Prometheus text otherwise."""
+    registry = registry or _registry
+    data = registry.to_json_lines() if path.endswith(".jsonl") else registry.to_prometheus()
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(data)
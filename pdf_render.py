@@ -0,0 +1,386 @@
+import hashlib
+import math
+import os
+import threading
+from collections import OrderedDict
+from io import BytesIO
+
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER, TA_LEFT
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer
+
+import metrics
+from markdown_doc import parse
+
+# Number of rendered PDFs remembered per process, keyed by markdown hash
+RENDER_CACHE_SIZE = int(os.environ.get("RENDER_CACHE_SIZE", "64"))
+# Paragraph heights remembered per process for layout estimates
+LAYOUT_CACHE_SIZE = int(os.environ.get("LAYOUT_CACHE_SIZE", "8192"))
+# Page count the condensed resume is meant to fit on
+RESUME_PAGE_LIMIT = int(os.environ.get("RESUME_PAGE_LIMIT", "2"))
+
+# SimpleDocTemplate lays the story out in one Frame per page with ReportLab's default 6pt padding
+FRAME_PADDING = 6
+# Allowance ReportLab gives a flowable overshooting the bottom of a frame
+LAYOUT_FUZZ = 1e-6
+
+
+class LayoutEstimate:
+    """
+    Predicted layout of a rendered resume, measured without building a PDF.
+
+    sections lists each section (the title block is named "Header") with the
+    pages it starts and ends on, its height in points and how much of it
+    lands beyond the page limit, in points and in body text lines.
+    """
+
+    def __init__(self, pages, last_page_fill, page_limit, sections):
+        self.pages = pages
+        self.last_page_fill = last_page_fill
+        self.page_limit = page_limit
+        self.sections = sections
+
+    @property
+    def fits(self):
+        return self.pages <= self.page_limit
+
+    @property
+    def overflowing_sections(self):
+        return [section for section in self.sections if section["overflow"] > 0]
+
+    def to_dict(self):
+        return {
+            "pages": self.pages,
+            "last_page_fill": self.last_page_fill,
+            "page_limit": self.page_limit,
+            "fits": self.fits,
+            "sections": self.sections,
+        }
+
+
+class ResumePdfRenderer:
+    """
+    Markdown to PDF renderer for the professional resume layout.
+
+    Styles are built once per renderer instead of once per document, and
+    rendered PDFs are memoized by the SHA-256 of their markdown (bounded LRU),
+    so re-rendering unchanged markdown returns the stored bytes.
+    """
+
+    def __init__(self, cache_size=RENDER_CACHE_SIZE):
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._heights = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._build_styles()
+
+    def _build_styles(self):
+        styles = getSampleStyleSheet()
+
+        # Create a professional color scheme
+        self.primary_color = colors.HexColor('#1a5276')  # Professional dark blue
+        self.secondary_color = colors.HexColor('#2874a6')  # Medium blue
+        self.accent_color = colors.HexColor('#3498db')  # Light blue
+        self.text_color = colors.HexColor('#2c3e50')  # Dark gray-blue for text
+
+        # Create custom styles with different names to avoid conflicts
+        self.title_style = ParagraphStyle(
+            name='ResumeTitle',
+            parent=styles['Heading1'],
+            fontName='Helvetica-Bold',
+            fontSize=20,
+            spaceAfter=10,
+            textColor=self.primary_color,
+            alignment=TA_CENTER,
+            borderPadding=5,
+            borderWidth=0,
+            leading=24  # Line height
+        )
+
+        self.section_style = ParagraphStyle(
+            name='ResumeSection',
+            parent=styles['Heading2'],
+            fontName='Helvetica-Bold',
+            fontSize=14,
+            spaceAfter=8,
+            spaceBefore=12,
+            textColor=self.primary_color,
+            borderColor=self.primary_color,
+            borderWidth=0,
+            borderPadding=5,
+            borderRadius=0,
+            leading=16,
+            # Add a bottom border
+            endDots=None,
+            bulletIndent=0,
+            firstLineIndent=0,
+            leftIndent=0,
+            rightIndent=0
+        )
+
+        self.subsection_style = ParagraphStyle(
+            name='ResumeSubsection',
+            parent=styles['Heading3'],
+            fontName='Helvetica-Bold',
+            fontSize=12,
+            spaceAfter=4,
+            spaceBefore=6,
+            textColor=self.secondary_color,
+            leading=14,
+            leftIndent=0
+        )
+
+        self.normal_style = ParagraphStyle(
+            name='ResumeNormal',
+            parent=styles['Normal'],
+            fontName='Helvetica',
+            fontSize=10,
+            spaceAfter=6,
+            textColor=self.text_color,
+            leading=14
+        )
+
+        self.list_item_style = ParagraphStyle(
+            name='ResumeListItem',
+            parent=styles['Normal'],
+            fontName='Helvetica',
+            fontSize=10,
+            leftIndent=10,
+            firstLineIndent=-10,  # Hanging indent for bullet points
+            textColor=self.text_color,
+            leading=14,
+            spaceBefore=2,
+            spaceAfter=2
+        )
+
+        self.hrule_style = ParagraphStyle(name='HRule', alignment=TA_LEFT)
+        self.hrule_markup = '<hr width="100%" color="{0}" />'.format(self.primary_color.hexval()[1:])
+
+    def new_document(self, buffer):
+        """Return a document template with margins optimized for a resume."""
+        # Use letter size with margins optimized for a resume
+        return SimpleDocTemplate(
+            buffer,
+            pagesize=letter,
+            rightMargin=54,  # Slightly reduced margins
+            leftMargin=54,
+            topMargin=54,
+            bottomMargin=54
+        )
+
+    def build_flowables(self, markdown_text):
+        """Parse markdown into the list of ReportLab flowables for one resume."""
+        elements = []
+
+        # Each line is tokenized once into (kind, ReportLab markup)
+        blocks = parse(markdown_text).pdf_blocks()
+        i = 0
+
+        # Process the first line as the resume title if it's a level 1 heading
+        if blocks[0][0] == 'title':
+            elements.append(Paragraph(blocks[0][1], self.title_style))
+            elements.append(Spacer(1, 10))
+            i = 1
+
+        # Track if we're inside a section to handle spacing
+        in_section = False
+
+        while i < len(blocks):
+            kind, markup = blocks[i]
+
+            # Process headers
+            if kind == 'title':
+                # Main title
+                elements.append(Paragraph(markup, self.title_style))
+                elements.append(Spacer(1, 10))
+                in_section = False
+
+            elif kind == 'section':
+                # Section headers with horizontal rule effect
+                elements.append(Spacer(1, 6))
+                elements.append(Paragraph(markup, self.section_style))
+                # Add a thin horizontal line
+                elements.append(Spacer(1, 2))
+                elements.append(Paragraph(self.hrule_markup, self.hrule_style))
+                elements.append(Spacer(1, 6))
+                in_section = True
+
+            elif kind == 'subsection':
+                # Subsection headers
+                elements.append(Paragraph(markup, self.subsection_style))
+                elements.append(Spacer(1, 4))
+                in_section = True
+
+            # Process lists
+            elif kind == 'item':
+                # Add the list items directly (not using ListFlowable for better control)
+                while i < len(blocks) and blocks[i][0] == 'item':
+                    # Create a custom bullet point
+                    elements.append(Paragraph('• ' + blocks[i][1], self.list_item_style))
+                    i += 1
+
+                continue  # Skip the increment at the end since we've already advanced
+
+            # Process normal paragraphs
+            elif kind == 'text':
+                elements.append(Paragraph(markup, self.normal_style))
+
+            # Add a small space for empty lines to maintain structure
+            elif i > 0 and i < len(blocks) - 1 and blocks[i-1][0] == 'blank' and blocks[i+1][0] != 'blank':
+                if in_section:
+                    elements.append(Spacer(1, 6))  # Smaller space within sections
+                else:
+                    elements.append(Spacer(1, 10))  # Larger space between major sections
+
+            i += 1
+
+        return elements
+
+    def estimate_layout(self, markdown_text, page_limit=RESUME_PAGE_LIMIT):
+        """
+        Predict the page count and per-section overflow of the rendered PDF.
+
+        The same flowables are wrapped and split page by page exactly as
+        ReportLab's frame would place them, but nothing is drawn, so this
+        costs a fraction of a full render.
+        """
+        with metrics.span("layout_estimate") as span:
+            doc = self.new_document(None)
+            width = doc.width - 2 * FRAME_PADDING
+            height = doc.height - 2 * FRAME_PADDING
+
+            # Each flowable belongs to the section opened by the last title or section heading before it
+            sections, pending = [], []
+            for flowable in self.build_flowables(markdown_text):
+                style = getattr(flowable, "style", None)
+                if style is self.title_style or style is self.section_style or not sections:
+                    title = flowable.getPlainText() if style is self.section_style else "Header"
+                    sections.append({"title": title, "start_page": None, "end_page": None, "height": 0.0, "overflow": 0.0})
+                pending.append((flowable, sections[-1], True))
+            pending.reverse()
+
+            page, y, at_top, previous_space_after = 1, height, True, 0
+            while pending:
+                flowable, section, whole = pending.pop()
+                # Space before a flowable overlaps the space after the previous one, and is dropped at the top of a page
+                space_before = 0 if at_top else max(flowable.getSpaceBefore() - previous_space_after, 0)
+                available = y - space_before
+                if available <= 0:
+                    flowable_height = float("inf")
+                elif whole:
+                    flowable_height = self._wrapped_height(flowable, width, available)
+                else:
+                    flowable_height = flowable.wrap(width, available)[1]
+                if flowable_height > available + LAYOUT_FUZZ:
+                    parts = []
+                    if available > 0:
+                        # split relies on the flowable having been wrapped, which a remembered height skipped
+                        flowable.wrap(width, available)
+                        parts = flowable.split(width, available)
+                    if parts:
+                        pending.extend((part, section, False) for part in reversed(parts))
+                        continue
+                    if not at_top:
+                        page, y, at_top, previous_space_after = page + 1, height, True, 0
+                        pending.append((flowable, section, whole))
+                        continue
+                    # Too tall for an empty page; ReportLab would raise a LayoutError, so count it as one full page
+                    flowable_height = available
+
+                space_after = flowable.getSpaceAfter()
+                used = space_before + flowable_height + space_after
+                if section["start_page"] is None:
+                    section["start_page"] = page
+                section["end_page"] = page
+                section["height"] += used
+                if page > page_limit:
+                    section["overflow"] += used
+                if used:
+                    at_top = False
+                y -= used
+                previous_space_after = space_after
+
+            for section in sections:
+                section["overflow_lines"] = math.ceil(section["overflow"] / self.normal_style.leading)
+            # An empty story builds a PDF without pages
+            pages = page if sections else 0
+            last_page_fill = min(1.0, (height - y) / height)
+            span.set(pages=pages)
+        return LayoutEstimate(pages, last_page_fill, page_limit, sections)
+
+    def _wrapped_height(self, flowable, width, available):
+        """
+        Return the height of a flowable wrapped to width.
+
+        Paragraph heights are remembered by style, markup and width, so after
+        an edit only the changed paragraphs are wrapped again.
+        """
+        if not isinstance(flowable, Paragraph):
+            return flowable.wrap(width, available)[1]
+        key = (flowable.style.name, flowable.text, width)
+        with self._lock:
+            flowable_height = self._heights.get(key)
+            if flowable_height is not None:
+                self._heights.move_to_end(key)
+                return flowable_height
+        flowable_height = flowable.wrap(width, available)[1]
+        with self._lock:
+            self._heights[key] = flowable_height
+            while len(self._heights) > LAYOUT_CACHE_SIZE:
+                self._heights.popitem(last=False)
+        return flowable_height
+
+    def _build(self, markdown_text):
+        with metrics.span("pdf_render") as span:
+            buffer = BytesIO()
+            doc = self.new_document(buffer)
+            flowables = self.build_flowables(markdown_text)
+            # doc.build consumes the list, so count the flowables first
+            span.set(flowables=len(flowables))
+            doc.build(flowables)
+            buffer.seek(0)
+            pdf_bytes = buffer.getvalue()
+            span.set(pdf_bytes=len(pdf_bytes))
+        return pdf_bytes
+
+    def render(self, markdown_text):
+        """Render markdown to PDF bytes, reusing the stored PDF if this markdown was rendered before."""
+        key = hashlib.sha256(markdown_text.encode("utf-8")).hexdigest()
+        with self._lock:
+            pdf_bytes = self._cache.get(key)
+            if pdf_bytes is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return pdf_bytes
+            self.misses += 1
+
+        pdf_bytes = self._build(markdown_text)
+
+        if self.cache_size:
+            with self._lock:
+                self._cache[key] = pdf_bytes
+                self._cache.move_to_end(key)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return pdf_bytes
+
+    def render_many(self, markdown_texts):
+        """Render several markdown documents, building each distinct document only once."""
+        return [self.render(markdown_text) for markdown_text in markdown_texts]
+
+
+_renderer = None
+_renderer_lock = threading.Lock()
+
+
+def get_renderer():
+    """Return the process-wide resume renderer."""
+    global _renderer
+    with _renderer_lock:
+        if _renderer is None:
+            _renderer = ResumePdfRenderer()
+        return _renderer
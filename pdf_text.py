@@ -0,0 +1,111 @@
+import os
+import tempfile
+import uuid
+from concurrent.futures import FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+
+import metrics
+from process_pool import SharedProcessPool
+
+# Documents shorter than this are extracted inline; the pool only pays off on long RFPs
+PARALLEL_MIN_PAGES = int(os.environ.get("PDF_PARALLEL_MIN_PAGES", "24"))
+PDF_WORKERS = int(os.environ.get("PDF_WORKERS", str(os.cpu_count() or 1)))
+PAGES_PER_TASK = int(os.environ.get("PDF_PAGES_PER_TASK", "8"))
+
+# Form feed between pages, as pdftotext writes it, so later stages can tell pages apart
+PAGE_BREAK = "\f"
+
+_pool = SharedProcessPool(PDF_WORKERS)
+
+# In a worker process: (document ID, reader) of the document its last page range came from
+_worker_document = None
+
+
+def load_reader():
+    """Return PyPDF2's PdfReader, importing PyPDF2 on first use instead of at startup."""
+    from PyPDF2 import PdfReader
+    return PdfReader
+
+
+def _extract_page_range(document_id, path, start, stop):
+    """
+    Extract pages [start, stop) of the PDF at path in a worker process.
+
+    Each worker reads and parses a document once and keeps it for the
+    following ranges with the same document_id; temporary file names can be
+    reused, so the path alone does not identify the document.
+    """
+    global _worker_document
+    if _worker_document is None or _worker_document[0] != document_id:
+        with open(path, "rb") as f:
+            _worker_document = (document_id, load_reader()(BytesIO(f.read())))
+    reader = _worker_document[1]
+    return start, [reader.pages[index].extract_text() for index in range(start, stop)]
+
+
+def iter_pages(data, max_pages=None, workers=None, progress=None):
+    """
+    Yield (page_index, text) pairs for a PDF as pages finish extracting.
+
+    Long documents are split into page ranges that are extracted in the shared
+    process pool, so pages may arrive out of order. max_pages caps how many
+    leading pages are read, workers <= 1 forces inline extraction, and
+    progress(done, total) is called after each batch of pages completes.
+    """
+    reader = load_reader()(BytesIO(data))
+    total = len(reader.pages)
+    if max_pages is not None:
+        total = min(total, max_pages)
+    workers = PDF_WORKERS if workers is None else workers
+
+    if workers <= 1 or total < PARALLEL_MIN_PAGES:
+        for index in range(total):
+            yield index, reader.pages[index].extract_text()
+            if progress:
+                progress(index + 1, total)
+        return
+
+    # Workers read the document from a temporary file, so the bytes are not pickled into every task
+    fd, path = tempfile.mkstemp(suffix=".pdf")
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    document_id = uuid.uuid4().hex
+    pool = _pool.get()
+    pending = set()
+    done_pages = 0
+    try:
+        pending = {
+            pool.submit(_extract_page_range, document_id, path, start, min(start + PAGES_PER_TASK, total))
+            for start in range(0, total, PAGES_PER_TASK)
+        }
+        while pending:
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                start, texts = future.result()
+                for offset, text in enumerate(texts):
+                    yield start + offset, text
+                done_pages += len(texts)
+                if progress:
+                    progress(done_pages, total)
+    except BrokenProcessPool:
+        _pool.discard(pool)
+        raise
+    finally:
+        # The consumer stopped early or a page failed, so drop work nobody will read
+        for future in pending:
+            future.cancel()
+        os.unlink(path)
+
+
+def extract_text(data, max_pages=None, workers=None, progress=None, page_break=""):
+    """
+    Return the text of a PDF's pages joined in page order by page_break.
+
+    With the default empty page_break this is exactly the text the serial loop builds.
+    """
+    with metrics.span("pdf_extract") as span:
+        pages = dict(iter_pages(data, max_pages=max_pages, workers=workers, progress=progress))
+        text = page_break.join(pages[index] for index in range(len(pages)))
+        span.set(pages=len(pages), chars=len(text), pdf_bytes=len(data))
+    return text
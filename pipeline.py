@@ -0,0 +1,115 @@
+import contextvars
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import metrics
+
+
+class Stage:
+    """
+    One step of a processing pipeline.
+
+    func is called with the results of its dependencies as keyword arguments
+    named after them. A stage that returns None is treated as failed, and the
+    stages depending on it are skipped. Stages marked main_thread always run
+    on the thread that called Pipeline.run, which is what Streamlit needs for
+    anything that draws on the page.
+    """
+
+    def __init__(self, name, func, deps=(), main_thread=False):
+        self.name = name
+        self.func = func
+        self.deps = tuple(deps)
+        self.main_thread = main_thread
+
+
+class PipelineRun:
+    """Results of one pipeline run: stage outputs, per-stage timings in seconds, and skipped stages."""
+
+    def __init__(self):
+        self.results = {}
+        self.timings = {}
+        self.skipped = []
+
+    def ok(self, name):
+        return self.results.get(name) is not None
+
+
+class Pipeline:
+    """A small stage graph that runs only the stages a target needs, overlapping independent ones."""
+
+    def __init__(self, stages, max_workers=4):
+        self.stages = {stage.name: stage for stage in stages}
+        self.max_workers = max_workers
+
+    def required(self, targets, inputs=()):
+        """Return the names of the stages that must run to produce targets, given precomputed inputs."""
+        needed = set()
+        pending = list(targets)
+        while pending:
+            name = pending.pop()
+            if name in needed or name in inputs:
+                continue
+            needed.add(name)
+            pending.extend(self.stages[name].deps)
+        return needed
+
+    def _call(self, stage, run):
+        started = time.perf_counter()
+        try:
+            return stage.func(**{dep: run.results[dep] for dep in stage.deps})
+        finally:
+            run.timings[stage.name] = time.perf_counter() - started
+            metrics.observe("pipeline_stage_seconds", run.timings[stage.name], stage=stage.name)
+
+    def run(self, targets, inputs=None):
+        """
+        Run every stage needed for targets and return a PipelineRun.
+
+        inputs maps stage names to results that are already known, so those
+        stages (and anything only they depend on) are not run again. Stages
+        that nothing in targets consumes are never run.
+        """
+        run = PipelineRun()
+        run.results.update(inputs or {})
+        needed = self.required(targets, run.results)
+        remaining = [name for name in self.stages if name in needed]
+        running = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while remaining or running:
+                ready = []
+                for name in list(remaining):
+                    deps = self.stages[name].deps
+                    if any(dep not in run.results for dep in deps):
+                        continue
+                    remaining.remove(name)
+                    if all(run.ok(dep) for dep in deps):
+                        ready.append(self.stages[name])
+                    else:
+                        # An upstream stage failed or was skipped
+                        run.results[name] = None
+                        run.skipped.append(name)
+
+                inline = [stage for stage in ready if stage.main_thread]
+                for stage in ready:
+                    if not stage.main_thread:
+                        # Copy context variables so per-run instrumentation follows the stage
+                        context = contextvars.copy_context()
+                        running[executor.submit(context.run, self._call, stage, run)] = stage.name
+
+                for stage in inline:
+                    run.results[stage.name] = self._call(stage, run)
+
+                if inline:
+                    # Inline results may have unblocked more stages, so rescan before waiting
+                    continue
+                if not running:
+                    break
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    run.results[name] = future.result()
+
+        return run
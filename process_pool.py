@@ -0,0 +1,42 @@
+"""
+Lazily started process pools, one per kind of work, shared by every caller in the process.
+
+Workers are spawned rather than forked: the Streamlit server is
+multi-threaded, and forking it can leave locks held in the children.
+"""
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+
+class SharedProcessPool:
+    """A process pool created on first use and replaced after it breaks."""
+
+    def __init__(self, max_workers):
+        self.max_workers = max_workers
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        """Return the pool, starting it if needed."""
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._pool
+
+    def discard(self, pool):
+        """Forget a broken pool so the next caller starts a fresh one."""
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self):
+        """Stop the pool, if it was started; a later get starts a new one."""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
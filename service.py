@@ -0,0 +1,261 @@
+"""
+Headless HTTP service exposing resume condensation to other systems.
+
+    python service.py --port 8080
+    python service.py --port 8080 --stub     # offline, against the stub model
+
+Endpoints:
+    POST /rfp/analyze       multipart "rfp" PDF -> {"requirements": markdown}
+    POST /resume/condense   multipart "resume" PDF, optionally an "rfp" PDF or
+                            an "rfp_requirements" markdown field; ?format=
+                            markdown (default), pdf or json (markdown plus
+                            the estimated page layout)
+    GET  /health            liveness and the model backend in use
+    GET  /metrics           Prometheus text from the metrics registry
+
+The server runs on Tornado's asyncio event loop, so many requests are in
+flight at once. PDF extraction runs in a process pool, model calls and
+ReportLab rendering in thread pools, and the event loop only parses
+requests and writes responses.
+"""
+import argparse
+import asyncio
+import functools
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import tornado.web
+
+import backends
+import metrics
+from tailoring import (
+    analyze_rfp,
+    clean_markdown,
+    estimate_resume_layout,
+    extract_text_cached,
+    generate_concise_resume,
+    markdown_to_pdf_reportlab,
+)
+from caching import content_hash
+from process_pool import SharedProcessPool
+
+SERVICE_PORT = int(os.environ.get("SERVICE_PORT", "8080"))
+SERVICE_MAX_UPLOAD_BYTES = int(os.environ.get("SERVICE_MAX_UPLOAD_BYTES", str(50 * 1024 * 1024)))
+SERVICE_EXTRACT_WORKERS = int(os.environ.get("SERVICE_EXTRACT_WORKERS", str(os.cpu_count() or 1)))
+# Model calls mostly wait on the network, so these threads are cheap; llm limits still apply
+SERVICE_LLM_THREADS = int(os.environ.get("SERVICE_LLM_THREADS", "32"))
+SERVICE_RENDER_THREADS = int(os.environ.get("SERVICE_RENDER_THREADS", "4"))
+
+FORMATS = {
+    "markdown": "text/markdown; charset=utf-8",
+    "pdf": "application/pdf",
+    "json": "application/json",
+}
+
+
+class ServiceError(Exception):
+    """A request failure reported to the client with an HTTP status."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _extract_pdf(data):
+    """Extract a PDF in a worker process; pages are read inline there."""
+    return extract_text_cached(data, content_hash(data), workers=1)
+
+
+class Executors:
+    """The pools blocking work is offloaded to, shared by all request handlers."""
+
+    def __init__(self, extract_workers=SERVICE_EXTRACT_WORKERS, llm_threads=SERVICE_LLM_THREADS,
+                 render_threads=SERVICE_RENDER_THREADS):
+        # Replaced after a worker dies, e.g. on a PDF that crashes PyPDF2, rather than failing every later request
+        self.extract = SharedProcessPool(extract_workers)
+        self.llm = ThreadPoolExecutor(max_workers=llm_threads, thread_name_prefix="llm")
+        self.render = ThreadPoolExecutor(max_workers=render_threads, thread_name_prefix="render")
+
+    def shutdown(self):
+        self.extract.shutdown()
+        self.llm.shutdown(cancel_futures=True)
+        self.render.shutdown(cancel_futures=True)
+
+
+async def _run(executor, func, *args, **kwargs):
+    # partial rather than a lambda so calls into the process pool can be pickled
+    return await asyncio.get_running_loop().run_in_executor(executor, functools.partial(func, *args, **kwargs))
+
+
+class BaseHandler(tornado.web.RequestHandler):
+
+    def initialize(self, executors):
+        self.executors = executors
+
+    def write_error(self, status_code, **kwargs):
+        error = kwargs.get("exc_info", (None, None))[1]
+        message = str(error) if isinstance(error, ServiceError) else self._reason
+        self.set_header("Content-Type", FORMATS["json"])
+        self.finish(json.dumps({"error": message}))
+
+    def send_error_for(self, error):
+        self.set_status(error.status)
+        self.set_header("Content-Type", FORMATS["json"])
+        self.finish(json.dumps({"error": str(error)}))
+
+    def uploaded_pdf(self, field, required=True):
+        """Return the bytes of a multipart PDF upload, or None if it is optional and missing."""
+        files = self.request.files.get(field)
+        if not files:
+            if required:
+                raise ServiceError(400, f"Missing multipart PDF field '{field}'")
+            return None
+        return files[0]["body"]
+
+    async def extract_in_pool(self, data):
+        """Extract a PDF in the process pool, retrying once on a fresh pool if a worker died."""
+        for attempt in range(2):
+            pool = self.executors.extract.get()
+            try:
+                return await _run(pool, _extract_pdf, data)
+            except BrokenProcessPool:
+                # The crash may have been another request's PDF, so this one gets a second try
+                self.executors.extract.discard(pool)
+                if attempt:
+                    raise
+
+    async def extract(self, field, required=True):
+        data = self.uploaded_pdf(field, required=required)
+        if data is None:
+            return None
+        with metrics.span("service_extract", field=field):
+            try:
+                text = await self.extract_in_pool(data)
+            except Exception as e:
+                raise ServiceError(422, f"Could not extract text from '{field}': {e}") from e
+        if not text:
+            raise ServiceError(422, f"Could not extract text from '{field}'")
+        return text
+
+    async def analyze_rfp(self, rfp_text):
+        try:
+            requirements = await _run(self.executors.llm, analyze_rfp, rfp_text)
+        except Exception as e:
+            raise ServiceError(502, str(e)) from e
+        if not requirements:
+            raise ServiceError(502, "RFP analysis failed")
+        return requirements
+
+
+class HealthHandler(BaseHandler):
+
+    def get(self):
+        self.write({"status": "ok", "backend": backends.get_backend().name})
+
+
+class MetricsHandler(BaseHandler):
+
+    def get(self):
+        self.set_header("Content-Type", "text/plain; version=0.0.4")
+        self.write(metrics.get_registry().to_prometheus())
+
+
+class AnalyzeRfpHandler(BaseHandler):
+
+    async def post(self):
+        try:
+            with metrics.span("service_request", endpoint="rfp/analyze"):
+                requirements = await self.analyze_rfp(await self.extract("rfp"))
+        except ServiceError as e:
+            self.send_error_for(e)
+            return
+        self.write({"requirements": requirements})
+
+
+class CondenseResumeHandler(BaseHandler):
+
+    async def post(self):
+        output_format = self.get_query_argument("format", None) or self.get_body_argument("format", "markdown")
+        try:
+            if output_format not in FORMATS:
+                raise ServiceError(400, f"Unknown format '{output_format}'; use one of {', '.join(FORMATS)}")
+            with metrics.span("service_request", endpoint="resume/condense"):
+                body = await self.condense(output_format)
+        except ServiceError as e:
+            self.send_error_for(e)
+            return
+        self.set_header("Content-Type", FORMATS[output_format])
+        self.write(body)
+
+    async def condense(self, output_format):
+        # Resume and RFP are extracted concurrently
+        resume_text, rfp_text = await asyncio.gather(self.extract("resume"), self.extract("rfp", required=False))
+        rfp_requirements = self.get_body_argument("rfp_requirements", None)
+        if rfp_text:
+            rfp_requirements = await self.analyze_rfp(rfp_text)
+
+        try:
+            concise_resume = await _run(
+                self.executors.llm, generate_concise_resume, resume_text, rfp_requirements=rfp_requirements
+            )
+        except Exception as e:
+            raise ServiceError(502, str(e)) from e
+        if not concise_resume:
+            raise ServiceError(502, "Resume condensation failed")
+        markdown_text = clean_markdown(concise_resume)
+
+        if output_format == "markdown":
+            return markdown_text.encode("utf-8")
+        if output_format == "pdf":
+            return await _run(self.executors.render, markdown_to_pdf_reportlab, markdown_text)
+        layout = await _run(self.executors.render, estimate_resume_layout, markdown_text)
+        return json.dumps({"markdown": markdown_text, "rfp_requirements": rfp_requirements, "layout": layout.to_dict()})
+
+
+def make_app(executors=None):
+    """Return the Tornado application; executors default to new pools sized from the SERVICE_* settings."""
+    executors = executors or Executors()
+    handlers = [
+        (r"/health", HealthHandler),
+        (r"/metrics", MetricsHandler),
+        (r"/rfp/analyze", AnalyzeRfpHandler),
+        (r"/resume/condense", CondenseResumeHandler),
+    ]
+    return tornado.web.Application([(path, handler, {"executors": executors}) for path, handler in handlers])
+
+
+async def serve(host, port, executors):
+    app = make_app(executors)
+    server = app.listen(port, address=host, max_body_size=SERVICE_MAX_UPLOAD_BYTES)
+    print(f"Serving on http://{host}:{port} with the {backends.get_backend().name} backend")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        server.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve resume condensation over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to listen on")
+    parser.add_argument("--port", type=int, default=SERVICE_PORT, help="Port to listen on")
+    parser.add_argument("--stub", action="store_true", help="Answer with the offline stub model instead of Gemini")
+    parser.add_argument("--extract-workers", type=int, default=SERVICE_EXTRACT_WORKERS, help="Processes for PDF extraction")
+    args = parser.parse_args(argv)
+    if args.stub:
+        backends.set_backend(backends.StubBackend())
+
+    executors = Executors(extract_workers=args.extract_workers)
+    try:
+        asyncio.run(serve(args.host, args.port, executors))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        executors.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""
+Shared store for the large per-session results: extracted texts, analyses, markdown and PDFs.
+
+Sessions keep only a small BlobRef in st.session_state. The content lives
+once per process in a content-addressed BlobCache, so the same RFP open in
+twenty tabs is held once. Blobs are kept in memory up to a byte budget,
+always written through to disk, and read back from disk after eviction.
+"""
+import os
+import threading
+
+from caching import CACHE_DIR, BlobCache, content_hash
+
+SESSION_STORE_MEMORY_BYTES = int(os.environ.get("SESSION_STORE_MEMORY_BYTES", str(64 * 1024 * 1024)))
+# Values smaller than this stay in the session as they are; a handle would save nothing
+SESSION_STORE_MIN_BYTES = int(os.environ.get("SESSION_STORE_MIN_BYTES", "1024"))
+# Blobs on disk older than this are removed, when the store is created and then periodically as blobs are stored
+SESSION_STORE_TTL = float(os.environ.get("SESSION_STORE_TTL", str(7 * 24 * 3600)))
+SESSION_STORE_MAX_BYTES = int(os.environ.get("SESSION_STORE_MAX_BYTES", str(1024 * 1024 * 1024)))
+
+
+class BlobRef:
+    """Handle to a value in the session store: the blob's key, whether it is text, and its size in bytes."""
+
+    __slots__ = ("key", "text", "size")
+
+    def __init__(self, key, text, size):
+        self.key = key
+        self.text = text
+        self.size = size
+
+    def __repr__(self):
+        return f"BlobRef({self.key[:12]}, {self.size} bytes)"
+
+
+class SessionStore:
+    """Content-addressed store that session values are put into and read back from through BlobRefs."""
+
+    def __init__(self, blobs, min_bytes=SESSION_STORE_MIN_BYTES):
+        self.blobs = blobs
+        self.min_bytes = min_bytes
+
+    def put(self, value):
+        """Store a str or bytes value and return its BlobRef; None and small values are returned as they are."""
+        if value is None:
+            return None
+        text = isinstance(value, str)
+        data = value.encode("utf-8") if text else value
+        if len(data) < self.min_bytes:
+            return value
+        key = content_hash(data)
+        try:
+            self.blobs.put(key, data)
+        except OSError:
+            # Without a disk copy the value cannot be evicted safely, so the session keeps it
+            return value
+        return BlobRef(key, text, len(data))
+
+    def get(self, handle):
+        """Return the value behind a handle from put, or None if its blob is gone."""
+        if not isinstance(handle, BlobRef):
+            return handle
+        data = self.blobs.get(handle.key)
+        if data is None:
+            return None
+        return data.decode("utf-8") if handle.text else data
+
+    def prune(self):
+        """Delete blobs past the store's TTL or disk budget; returns how many were removed."""
+        return self.blobs.prune()
+
+    def stats(self):
+        return self.blobs.stats()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_session_store():
+    """Return the process-wide session store."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = SessionStore(BlobCache(
+                os.path.join(CACHE_DIR, "sessions"),
+                SESSION_STORE_MEMORY_BYTES,
+                ttl=SESSION_STORE_TTL,
+                disk_budget=SESSION_STORE_MAX_BYTES,
+            ))
+        return _store
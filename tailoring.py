@@ -0,0 +1,472 @@
+"""
+The resume tailoring pipeline without any UI: PDF extraction, RFP analysis,
+resume condensation, markdown cleaning and PDF rendering.
+
+The Streamlit app, the batch CLI and the HTTP service all build on these
+helpers. Nothing here imports Streamlit, so the service and its worker
+processes stay free of it; failures are raised for the caller to report.
+"""
+import contextvars
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import backends
+import llm
+import metrics
+import pdf_text
+from caching import content_hash, get_extraction_cache
+from chunking import split_into_chunks
+from compaction import compact_document, compact_requirements
+from llm import generate_text
+from markdown_doc import parse as parse_markdown
+from pipeline import Pipeline, Stage
+from sections import (
+    EMPTY_SECTION_MARKER,
+    SECTION_MAX_CONCURRENCY,
+    SECTIONED_RESUME,
+    SECTIONS,
+    assemble,
+    cached_section,
+    clean_section,
+    relevant_requirements,
+    section_key,
+    store_section,
+)
+
+# Optional cap on the number of leading pages read from each uploaded PDF
+PDF_MAX_PAGES = int(os.environ["PDF_MAX_PAGES"]) if os.environ.get("PDF_MAX_PAGES") else None
+# Part of the extraction cache key; bump when the extracted text changes shape so older entries are not reused
+EXTRACTION_FORMAT_VERSION = "1"
+
+# RFPs longer than the threshold (in characters) are analyzed chunk by chunk and merged
+RFP_CHUNK_THRESHOLD = int(os.environ.get("RFP_CHUNK_THRESHOLD", "60000"))
+RFP_CHUNK_SIZE = int(os.environ.get("RFP_CHUNK_SIZE", "20000"))
+RFP_CHUNK_OVERLAP = int(os.environ.get("RFP_CHUNK_OVERLAP", "1000"))
+RFP_MAX_CONCURRENT_CHUNKS = int(os.environ.get("RFP_MAX_CONCURRENT_CHUNKS", "4"))
+NO_REQUIREMENTS_MARKER = "No consultant requirements"
+# Stripped from a chunk's reply before comparing it with the marker, e.g. '"No consultant requirements."'
+NO_REQUIREMENTS_PUNCTUATION = re.compile(r'^[\s"\'*_#`.]+|[\s"\'*_#`.!]+$')
+
+
+def extract_text_from_pdf(pdf_file, max_pages=PDF_MAX_PAGES, progress=None, workers=None):
+    """Extract text content from uploaded PDF file."""
+    try:
+        data = pdf_file if isinstance(pdf_file, bytes) else pdf_file.read()
+        # Pages are extracted in parallel for long documents, same text as a serial walk;
+        # pages stay separated by PAGE_BREAK so prompt compaction can find headers and footers
+        return pdf_text.extract_text(
+            data, max_pages=max_pages, progress=progress, workers=workers, page_break=pdf_text.PAGE_BREAK
+        )
+    except Exception as e:
+        raise RuntimeError(f"Error reading PDF: {e}") from e
+
+
+def extract_text_cached(pdf_bytes, digest=None, max_pages=PDF_MAX_PAGES, progress=None, workers=None):
+    """Extract text from PDF bytes once per distinct file content, shared across sessions."""
+    digest = digest or content_hash(pdf_bytes)
+    digest = f"{digest}-v{EXTRACTION_FORMAT_VERSION}"
+    if max_pages is not None:
+        digest = f"{digest}-p{max_pages}"
+    cache = get_extraction_cache()
+    cached = cache.get(digest)
+    if cached is not None:
+        return cached.decode("utf-8")
+    
+    text = extract_text_from_pdf(pdf_bytes, max_pages=max_pages, progress=progress, workers=workers)
+    cache.put(digest, text.encode("utf-8"))
+    return text
+
+
+def analyze_resume(text, on_chunk=None):
+    """Use Gemini to analyze and extract key information from resume text."""
+    try:
+        text, _ = compact_document(text)
+        prompt = f"""
+        Analyze this resume text and extract the following key information:
+        - Personal Information (name, contact details)
+        - Professional Summary
+        - Key Skills
+        - Work Experience (most relevant and recent)
+        - Education
+        - Certifications (if any)
+        
+        Text: {text}
+        
+        Format the output in markdown with clear section headers and proper markdown formatting.
+        Focus on the most relevant information for a consultant role.
+        Use proper markdown syntax for headers (#), lists (-), and emphasis (*).
+        """
+        return generate_text(prompt, on_chunk=on_chunk)
+    except Exception as e:
+        raise RuntimeError(f"Error analyzing resume: {e}") from e
+
+
+def analyze_rfp(text, on_chunk=None):
+    """Use Gemini to analyze and extract key requirements from RFP text."""
+    try:
+        # Page furniture and whitespace are stripped first, which can also keep an RFP under the chunk threshold
+        text, _ = compact_document(text)
+        
+        # Very large RFPs do not fit one prompt, so analyze them in chunks and merge
+        if len(text) > RFP_CHUNK_THRESHOLD:
+            return analyze_rfp_chunked(text, on_chunk=on_chunk)
+        
+        prompt = f"""
+        Analyze this Request for Proposal (RFP) document and extract the most important information required from a consultant profile standpoint.
+        
+        Focus on extracting:
+        - Required qualifications
+        - Technical skills needed
+        - Domain knowledge requirements
+        - Years of experience requirements
+        - Certifications required
+        - Specific expertise areas
+        - Project roles and responsibilities
+        - Any other critical requirements for consultants
+        
+        Text: {text}
+        
+        Format the output in markdown with clear section headers and proper markdown formatting.
+        Use proper markdown syntax for headers (#), lists (-), and emphasis (*).
+        Prioritize the most important requirements that would be relevant for matching a consultant profile.
+        """
+        return generate_text(prompt, on_chunk=on_chunk)
+    except Exception as e:
+        raise RuntimeError(f"Error analyzing RFP: {e}") from e
+
+
+def analyze_rfp_chunk(chunk, part, parts):
+    """Use Gemini to extract consultant requirements from one part of a large RFP."""
+    prompt = f"""
+        You are reading part {part} of {parts} of a large Request for Proposal (RFP) document.
+        Extract the information in this part that is required from a consultant profile standpoint.
+        
+        Focus on extracting:
+        - Required qualifications
+        - Technical skills needed
+        - Domain knowledge requirements
+        - Years of experience requirements
+        - Certifications required
+        - Specific expertise areas
+        - Project roles and responsibilities
+        - Any other critical requirements for consultants
+        
+        Only report requirements stated in this part. If it contains none, reply with "{NO_REQUIREMENTS_MARKER}".
+        
+        Text: {chunk}
+        
+        Format the output in markdown with clear section headers and proper markdown formatting.
+        Use proper markdown syntax for headers (#), lists (-), and emphasis (*).
+        """
+    return generate_text(prompt)
+
+
+def is_no_requirements(analysis):
+    """True if a chunk's analysis is just the no-requirements marker, perhaps with punctuation or emphasis around it."""
+    stripped = NO_REQUIREMENTS_PUNCTUATION.sub('', analysis).casefold()
+    return stripped in (NO_REQUIREMENTS_MARKER.casefold(), f"{NO_REQUIREMENTS_MARKER} found".casefold())
+
+
+def dedupe_requirement_lines(analyses):
+    """
+    Drop list items repeated verbatim under the same heading across partial
+    RFP analyses, keeping the first occurrence; the same item under another
+    heading (another role, say) is a separate requirement and is kept.
+    """
+    seen = set()
+    deduped = []
+    for analysis in analyses:
+        heading = ''
+        lines = []
+        for line in analysis.split('\n'):
+            stripped = line.strip()
+            if stripped.startswith('#'):
+                heading = re.sub(r'\s+', ' ', stripped.lstrip('#')).strip().lower()
+            elif stripped.startswith(('- ', '* ')):
+                key = (heading, re.sub(r'\s+', ' ', stripped[2:]).strip().lower())
+                if key in seen:
+                    continue
+                seen.add(key)
+            lines.append(line)
+        deduped.append('\n'.join(lines))
+    return deduped
+
+
+def merge_rfp_analyses(analyses, on_chunk=None):
+    """Use Gemini to merge partial RFP analyses into one deduplicated requirements document."""
+    combined = "\n\n---\n\n".join(
+        f"Part {part}:\n{analysis}" for part, analysis in enumerate(dedupe_requirement_lines(analyses), start=1)
+    )
+    prompt = f"""
+        The following are analyses of consecutive parts of one Request for Proposal (RFP) document.
+        Merge them into a single analysis of the most important information required from a consultant profile standpoint.
+        
+        Organize the result under these sections:
+        - Required qualifications
+        - Technical skills needed
+        - Domain knowledge requirements
+        - Years of experience requirements
+        - Certifications required
+        - Specific expertise areas
+        - Project roles and responsibilities
+        - Any other critical requirements for consultants
+        
+        Combine requirements that say the same thing, keep the strictest version when parts disagree,
+        and do not mention the parts themselves.
+        
+        Partial analyses: {combined}
+        
+        Format the output in markdown with clear section headers and proper markdown formatting.
+        Use proper markdown syntax for headers (#), lists (-), and emphasis (*).
+        Prioritize the most important requirements that would be relevant for matching a consultant profile.
+        """
+    return generate_text(prompt, on_chunk=on_chunk)
+
+
+def analyze_rfp_chunked(text, on_chunk=None):
+    """Analyze a large RFP map-reduce style: chunks are analyzed concurrently, then merged."""
+    chunks = split_into_chunks(text, chunk_size=RFP_CHUNK_SIZE, overlap=RFP_CHUNK_OVERLAP)
+    
+    # Bound the number of Gemini calls in flight for a single RFP
+    with ThreadPoolExecutor(max_workers=RFP_MAX_CONCURRENT_CHUNKS) as executor:
+        # Each chunk runs in a copy of this context so its spans reach the caller's metrics.collect()
+        futures = [
+            executor.submit(contextvars.copy_context().run, analyze_rfp_chunk, chunk, part, len(chunks))
+            for part, chunk in enumerate(chunks, start=1)
+        ]
+        analyses = [future.result() for future in futures]
+    
+    analyses = [analysis for analysis in analyses if not is_no_requirements(analysis)]
+    if not analyses:
+        return f"# RFP Requirements\n\n{NO_REQUIREMENTS_MARKER} found."
+    if len(analyses) == 1:
+        if on_chunk is not None:
+            on_chunk(analyses[0])
+        return analyses[0]
+    return merge_rfp_analyses(analyses, on_chunk=on_chunk)
+
+
+def generate_concise_resume(raw_cv, rfp_requirements=None, on_chunk=None, sectioned=SECTIONED_RESUME):
+    """
+    Generate a concise 2-page resume using the analyzed information, optionally tailored to RFP requirements.
+    
+    With sectioned the resume is generated as separately cached sections (see sections.py).
+    """
+    try:
+        raw_cv, _ = compact_document(raw_cv)
+        if rfp_requirements:
+            # The analysis is pasted into every condense prompt, so it is compacted too
+            rfp_requirements, _ = compact_requirements(rfp_requirements)
+        
+        if sectioned:
+            return generate_resume_by_section(raw_cv, rfp_requirements, on_chunk=on_chunk)
+        
+        # Base prompt
+        base_prompt = f"""
+            You are an expert resume formatter and summarizer, specializing in refining consultant resumes for client evaluation. 
+            Your task is to transform the following consultant resume into a concise, high-impact, 2-page version tailored for client review.
+
+            Instructions for Refinement:
+
+            Maximize Impact:
+            -Prioritize achievements, quantifiable results, and value delivered over general responsibilities.
+            -Highlight client outcomes, project impact, and business value created by the consultant.
+
+            Format Professional Experience:
+            -Use ### for company names as section headers
+            -Use bullet points (-) for experience details under each company
+            -Include dates on the same line as company name in parentheses
+            -Example format:
+              ### Job Title | Company Name | Start Date - End Date |
+              - Achievement 1
+              - Achievement 2
+
+            Summarize & Condense:
+            -Convert lengthy descriptions into concise, results-driven bullet points.
+            -Remove redundant, outdated, or lower-impact details.
+
+            Highlight Core Competencies:
+            -Clearly showcase technical skills, industry expertise, methodologies, and soft skills essential for consulting.
+            -Group skills into logical categories for easy scanning.
+            
+            Output Format:
+            -Use consistent markdown formatting throughout
+            -Ensure company names stand out as distinct sections
+            -Maintain proper hierarchy in the document structure
+        """
+        
+        # Add RFP-specific instructions if available
+        if rfp_requirements:
+            rfp_tailoring = f"""
+            RFP Tailoring:
+            -The resume should be specifically tailored to match the following RFP requirements:
+            
+            {rfp_requirements}
+            
+            -Emphasize experiences, skills, and achievements that directly align with these RFP requirements
+            -Reorganize content to highlight the most relevant qualifications first
+            -Use terminology and keywords from the RFP where appropriate
+            -Ensure that the consultant's qualifications that match the RFP requirements are clearly visible
+            """
+            base_prompt += rfp_tailoring
+        
+        # Complete the prompt with the resume content
+        complete_prompt = base_prompt + f"""
+            Here is the full consultant Resume:
+
+            {raw_cv}
+ 
+            Begin the formatted, condensed 2-page resume below:
+        """
+        
+        return generate_text(complete_prompt, on_chunk=on_chunk)
+    except Exception as e:
+        raise RuntimeError(f"Error generating concise resume: {e}") from e
+
+
+def generate_resume_section(raw_cv, section, requirements, on_chunk=None):
+    """Use Gemini to write one section of the concise resume, tailored to the RFP requirements relevant to it."""
+    heading = f'Start the section with the heading "{section.heading}".' if section.heading else ""
+    prompt = f"""
+            You are an expert resume formatter and summarizer, specializing in refining consultant resumes for client evaluation. 
+            You are writing one section of a concise, high-impact, 2-page version of the following consultant resume, tailored for client review.
+            The other sections are written separately, so write only the {section.title} section. {heading}
+
+            Instructions for the {section.title} section:
+            {section.instructions}
+            
+            Output Format:
+            -Use consistent markdown formatting throughout
+            -If the resume contains nothing for this section, reply with "{EMPTY_SECTION_MARKER}" only
+        """
+    if requirements:
+        prompt += f"""
+            RFP Tailoring:
+            -This section should be specifically tailored to match the following RFP requirements:
+            
+            {requirements}
+            
+            -Emphasize experiences, skills, and achievements that directly align with these RFP requirements
+            -Order content to highlight the most relevant qualifications first
+            -Use terminology and keywords from the RFP where appropriate
+        """
+    prompt += f"""
+            Here is the full consultant Resume:
+
+            {raw_cv}
+ 
+            Begin the formatted {section.title} section below:
+        """
+    return clean_section(generate_text(prompt, on_chunk=on_chunk))
+
+
+def generate_resume_by_section(raw_cv, rfp_requirements=None, on_chunk=None):
+    """
+    Generate the concise resume section by section, reusing cached sections whose inputs are unchanged.
+    
+    Sections missing from the cache are generated concurrently. When
+    on_chunk is given it receives the assembled document so far as any
+    section streams.
+    """
+    resume_hash = content_hash(raw_cv.encode("utf-8"))
+    model = backends.get_backend().cache_name(llm.MODEL_NAME)
+    sections = {}
+    missing = []
+    for section in SECTIONS:
+        requirements = relevant_requirements(rfp_requirements, section)
+        key = section_key(model, resume_hash, section, requirements)
+        cached = cached_section(key, section)
+        if cached is None:
+            missing.append((section, requirements, key))
+        else:
+            sections[section.name] = cached
+    
+    lock = threading.Lock()
+    partial = dict(sections)
+    
+    def stream_into(section):
+        def update(text):
+            with lock:
+                partial[section.name] = clean_section(text)
+                on_chunk(assemble(partial))
+        return update if on_chunk is not None else None
+    
+    def generate(section, requirements, key):
+        with metrics.span("resume_section", section=section.name):
+            text = generate_resume_section(raw_cv, section, requirements, on_chunk=stream_into(section))
+        store_section(key, text)
+        return text
+    
+    if missing:
+        with ThreadPoolExecutor(max_workers=SECTION_MAX_CONCURRENCY) as executor:
+            # Each section runs in a copy of this context so its spans reach the caller's metrics.collect()
+            futures = {
+                section.name: executor.submit(contextvars.copy_context().run, generate, section, requirements, key)
+                for section, requirements, key in missing
+            }
+            sections.update((name, future.result()) for name, future in futures.items())
+    
+    markdown_text = assemble(sections)
+    if on_chunk is not None:
+        on_chunk(markdown_text)
+    return markdown_text
+
+
+def build_resume_pipeline(pdf_bytes=None, rfp_requirements=None, on_chunk=None, sectioned=SECTIONED_RESUME):
+    """
+    Build the resume processing stage graph: extract -> analyze / condense -> clean -> render.
+    
+    The standalone analysis is not an input to any other stage, so it only runs
+    when asked for explicitly. Condensation runs on the calling thread so it
+    can stream into the page. Pass the extracted text as the "extract" input
+    instead of pdf_bytes when it is already known.
+    """
+    return Pipeline([
+        Stage("extract", lambda: extract_text_cached(pdf_bytes)),
+        Stage("analyze", lambda extract: analyze_resume(extract), deps=["extract"]),
+        Stage(
+            "condense",
+            lambda extract: generate_concise_resume(
+                extract, rfp_requirements=rfp_requirements, on_chunk=on_chunk, sectioned=sectioned
+            ),
+            deps=["extract"],
+            main_thread=True
+        ),
+        Stage("clean", lambda condense: clean_markdown(condense), deps=["condense"]),
+        Stage("render", lambda clean: markdown_to_pdf_reportlab(clean), deps=["clean"]),
+    ])
+
+
+def clean_markdown(markdown_text):
+    """Clean and standardize markdown formatting."""
+    with metrics.span("markdown_clean", output="markdown"):
+        # Headers, list markers, blank-line runs and a leading ```markdown fence are normalized in one pass
+        return parse_markdown(markdown_text).normalized().to_markdown()
+
+
+def clean_text_for_download(markdown_text):
+    """
+    Removes markdown formatting characters (* and #) from text for plain text download
+    """
+    if not markdown_text:
+        return ""
+    
+    with metrics.span("markdown_clean", output="plain_text"):
+        # The plain text rendering is cached with the parsed document, so reruns are free
+        return parse_markdown(markdown_text).to_plain_text()
+
+
+def markdown_to_pdf_reportlab(markdown_text):
+    """Convert markdown to PDF using ReportLab with enhanced styling for a professional resume."""
+    # ReportLab is imported on first use rather than on every cold start
+    from pdf_render import get_renderer
+    # Styles are built once per process and unchanged markdown is served from the render memo
+    return get_renderer().render(markdown_text)
+
+
+def estimate_resume_layout(markdown_text):
+    """Predict the page count of the PDF markdown_to_pdf_reportlab would render, without rendering it."""
+    from pdf_render import get_renderer
+    return get_renderer().estimate_layout(markdown_text)